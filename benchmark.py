@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+RDR2 Session Manager - Benchmarks
+Mide el rendimiento del almacenamiento de sesiones sin abrir la interfaz
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+
+from rdr2_core import (
+    AESGCM,
+    DerivedKeyCache,
+    JsonSessionBackend,
+    SessionRecord,
+    SessionStore,
+    SessionVault,
+)
+
+PASSWORD = "benchmark"
+
+
+def make_records(count):
+    """Sesiones sintéticas; grupo, etiqueta y plantilla se crean como cadenas nuevas, igual que al leer JSON"""
+    return [
+        SessionRecord(f"Sesión {i}", f"clave-{i:08d}", tags=(f"tag{i % 10}",), group=f"grupo{i % 5}",
+                      use_count=i % 3, last_used=float(i), profile="".join(["def", "ault"]))
+        for i in range(count)
+    ]
+
+
+def make_store(count):
+    """Crea un almacén con `count` sesiones sintéticas"""
+    return SessionStore.from_records(make_records(count))
+
+
+def best_of(repeat, func):
+    """Devuelve el mejor tiempo (ms) de `repeat` ejecuciones"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_backend(label, open_backend, repeat):
+    """Mide abrir, agregar una sesión, listar y leer una sesión"""
+    backend = open_backend()
+    store = backend.load()
+    counter = iter(range(10 ** 9))
+
+    def add_one():
+        record = SessionRecord(f"Nueva {next(counter)}", "clave-nueva")
+        store.add(record)
+        backend.commit(store, changed=[record])
+
+    def list_names():
+        return [record.name for record in open_backend().load()]
+
+    results = {
+        "abrir": best_of(repeat, lambda: open_backend().load()),
+        "agregar": best_of(repeat, add_one),
+        "listar": best_of(repeat, list_names),
+    }
+    if isinstance(backend, SessionVault):
+        results["leer una"] = best_of(repeat, lambda: backend.get("Sesión 0"))
+    print(f"{label:<28}" + "".join(f"{name:>12}: {ms:8.2f} ms" for name, ms in results.items()))
+
+
+def bench_vault(count, repeat):
+    """Compara el JSON en texto plano con la bóveda cifrada"""
+    if AESGCM is None:
+        print("❌ El paquete 'cryptography' no está instalado")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="rdr2_bench_")
+    try:
+        print(f"📦 {count:,} sesiones, mejor de {repeat} ejecuciones")
+        store = make_store(count)
+
+        json_path = os.path.join(workdir, "rdr2_sessions.json")
+        JsonSessionBackend(json_path).commit(store)
+        bench_backend("JSON (texto plano)", lambda: JsonSessionBackend(json_path), repeat)
+
+        vault_path = os.path.join(workdir, "rdr2_sessions.vault")
+        key_cache = DerivedKeyCache()
+        SessionVault.create(vault_path, PASSWORD, make_store(count), key_cache, lambda: PASSWORD)
+        bench_backend("Bóveda (clave en caché)",
+                      lambda: SessionVault(vault_path, key_cache, lambda: PASSWORD), repeat)
+
+        # Sin caché cada apertura vuelve a derivar la clave con scrypt
+        cold_ms = best_of(repeat, lambda: SessionVault(vault_path, DerivedKeyCache(), lambda: PASSWORD).load())
+        print(f"{'Bóveda (sin caché)':<28}{'abrir':>12}: {cold_ms:8.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def measure(build):
+    """Memoria (MB) que queda retenida por el resultado de `build` y pico durante la construcción"""
+    tracemalloc.start()
+    try:
+        result = build()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / 2 ** 20, peak / 2 ** 20
+
+
+def legacy_sessions(count):
+    """Representación anterior: dict nombre -> clave y una fila de texto ya formateado por sesión"""
+    sessions = {f"Sesión {i}": f"clave-{i:08d}" for i in range(count)}
+    rows = [(f"🎮 {name}", f"🔑 {key}") for name, key in sessions.items()]
+    return sessions, rows
+
+
+def bench_memory(count, page_size):
+    """Memoria por sesión del almacén frente a la representación anterior"""
+    print(f"📦 {count:,} sesiones")
+    results = []
+
+    _, current, peak = measure(lambda: legacy_sessions(count))
+    results.append(("dict + filas formateadas (antes)", current, peak))
+
+    records, current, peak = measure(lambda: make_records(count))
+    results.append(("SessionRecord con __slots__", current, peak))
+
+    tracemalloc.start()
+    store = SessionStore.from_records(records)
+    index_mb = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+    results.append(("  + índices del almacén", index_mb, index_mb))
+    del records
+
+    # La tabla solo formatea la ventana visible: id de fila -> registro
+    def visible_rows():
+        view = list(store)
+        return view, [(f"🎮 {r.name}", f"🔑 {r.key}", r.group, ", ".join(r.tags), r.profile, r.use_count)
+                      for r in view[:page_size]]
+    _, current, peak = measure(visible_rows)
+    results.append((f"  + vista con {page_size} filas visibles", current, peak))
+
+    workdir = tempfile.mkdtemp(prefix="rdr2_bench_")
+    try:
+        json_path = os.path.join(workdir, "rdr2_sessions.json")
+        JsonSessionBackend(json_path).commit(store)
+        del store
+        _, current, peak = measure(lambda: JsonSessionBackend(json_path).load())
+        results.append(("Cargar desde JSON", current, peak))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'':<38}{'retenido':>12}{'pico':>12}{'por sesión':>14}")
+    for label, current, peak in results:
+        per_session = current * 2 ** 20 / count
+        print(f"{label:<38}{current:9.1f} MB{peak:9.1f} MB{per_session:10.0f} B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de RDR2 Session Manager")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    vault_parser = subparsers.add_parser("vault", help="JSON en texto plano vs bóveda cifrada")
+    vault_parser.add_argument("--sessions", type=int, default=1000, help="Número de sesiones")
+    vault_parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medida")
+
+    memory_parser = subparsers.add_parser("memory", help="Memoria por sesión (tracemalloc)")
+    memory_parser.add_argument("--sessions", type=int, default=1000000, help="Número de sesiones")
+    memory_parser.add_argument("--page-size", type=int, default=200, help="Filas visibles en la tabla")
+
+    args = parser.parse_args()
+
+    if args.command == "vault":
+        bench_vault(args.sessions, args.repeat)
+    elif args.command == "memory":
+        bench_memory(args.sessions, args.page_size)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
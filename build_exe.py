@@ -9,6 +9,13 @@ import sys
 import subprocess
 import hashlib
 import shutil
+import time
+import tempfile
+import itertools
+import statistics
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import argparse
 
@@ -20,6 +27,39 @@ BUILD_CONFIG = {
     "version": "1.0.0"
 }
 
+# Matriz de builds para comparar configuraciones de release
+MATRIX_DIR = Path("build/matrix")
+MATRIX_MODES = ["onefile", "onedir"]
+MATRIX_UPX = [False, True]
+MATRIX_EXCLUDES = {
+    "completo": [],
+    "tk-minimo": [
+        "tkinter.tix", "tkinter.dnd", "tkinter.test", "tkinter.scrolledtext",
+        "idlelib", "turtle", "turtledemo",
+    ],
+    "sin-cjk": [
+        # Códecs CJK de encodings y sus extensiones nativas
+        "_codecs_cn", "_codecs_hk", "_codecs_iso2022", "_codecs_jp",
+        "_codecs_kr", "_codecs_tw", "_multibytecodec",
+    ],
+}
+MATRIX_EXCLUDES["ligero"] = MATRIX_EXCLUDES["tk-minimo"] + MATRIX_EXCLUDES["sin-cjk"]
+
+# Recorte del grafo de importaciones a partir de una traza real de arranque
+TRIM_DIR = Path("build/trim")
+# El arranque de traza también importa estos módulos, así que se conserva todo lo que importan
+TRIM_KEEP_MODULES = [
+    # Importado bajo demanda (botones de Discord y carpeta de plantillas)
+    "webbrowser",
+    # Se importa al cargar la app, pero parte de sus submódulos solo al cifrar o descifrar
+    "cryptography",
+    # Códecs: la página de códigos de Windows depende del idioma del sistema
+    "encodings", "_multibytecodec", "_codecs_cn", "_codecs_hk", "_codecs_iso2022",
+    "_codecs_jp", "_codecs_kr", "_codecs_tw",
+]
+EXTENSION_RE = re.compile(r"^(?:python3\.\d+[/\\])?(?:lib-dynload[/\\])?([\w/\\]+?)"
+                          r"(?:\.cpython-[^.]+\.so|\.abi3\.so|(?:\.cp\d+-win_amd64)?\.pyd)$")
+
 def print_banner():
     """Muestra el banner del script"""
     print("🎮 RDR2 Session Manager - Build Script")
@@ -68,6 +108,36 @@ def clean_build_dirs():
             print(f"🧹 Limpiando: {dir_name}")
             shutil.rmtree(dir_name)
 
+def pyinstaller_command(onefile=True, upx=True, excludes=(), workdir=None):
+    """Construye el comando de PyInstaller para una configuración"""
+    cmd = [
+        "pyinstaller",
+        "--onefile" if onefile else "--onedir",  # Un solo archivo o carpeta
+        "--noconsole",                           # Sin ventana de consola
+        f"--name={BUILD_CONFIG['app_name']}",    # Nombre del ejecutable
+        "--optimize=2",                          # Optimización máxima
+        "--clean",                               # Limpiar cache
+    ]
+    if not upx:
+        cmd.append("--noupx")
+    elif os.environ.get("UPX_DIR"):
+        cmd.append(f"--upx-dir={os.environ['UPX_DIR']}")
+    for module in excludes:
+        cmd.append(f"--exclude-module={module}")
+
+    # Cada variante de la matriz compila en su propio directorio
+    if workdir is not None:
+        cmd += [
+            f"--workpath={workdir / 'work'}",
+            f"--distpath={workdir / 'dist'}",
+            f"--specpath={workdir}",
+        ]
+
+    # Agregar icono si existe
+    if Path(BUILD_CONFIG['icon_file']).exists():
+        cmd.append(f"--icon={Path(BUILD_CONFIG['icon_file']).resolve()}")
+    return cmd
+
 def build_executable(clean=True, debug=False):
     """Compila el ejecutable con PyInstaller"""
     
@@ -77,18 +147,8 @@ def build_executable(clean=True, debug=False):
     print("🔨 Iniciando compilación...")
     
     # Comando base de PyInstaller
-    cmd = [
-        "pyinstaller",
-        "--onefile",                              # Un solo archivo
-        "--noconsole",                           # Sin ventana de consola
-        f"--name={BUILD_CONFIG['app_name']}",    # Nombre del ejecutable
-        "--optimize=2",                          # Optimización máxima
-        "--clean",                               # Limpiar cache
-    ]
-    
-    # Agregar icono si existe
+    cmd = pyinstaller_command()
     if Path(BUILD_CONFIG['icon_file']).exists():
-        cmd.append(f"--icon={BUILD_CONFIG['icon_file']}")
         print(f"🎨 Usando icono: {BUILD_CONFIG['icon_file']}")
     
     # Modo debug (mantiene consola)
@@ -219,6 +279,269 @@ def print_summary(build_info):
     print("4. git push origin main")
     print("5. git push origin v1.0.0")
 
+def exe_name():
+    """Nombre del ejecutable generado en esta plataforma"""
+    return BUILD_CONFIG['app_name'] + (".exe" if os.name == "nt" else "")
+
+def dir_size(path):
+    """Tamaño total en bytes de un directorio"""
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+# Tipos del TOC que el bootloader --onefile escribe a disco: binario, datos, zip y enlace simbólico.
+# El PYZ ('z') y los scripts/módulos de arranque ('s', 'm', 'M') se leen desde el propio ejecutable.
+EXTRACTED_TYPECODES = {"b", "x", "Z", "n"}
+
+def onefile_extracted_size(exe_path):
+    """Bytes que un ejecutable --onefile descomprime al arrancar (según su CArchive)"""
+    try:
+        from PyInstaller.archive.readers import CArchiveReader
+        reader = CArchiveReader(str(exe_path))
+        # Entrada del TOC: (posición, tamaño comprimido, tamaño real, comprimido, tipo)
+        return sum(entry[2] for entry in reader.toc.values() if entry[4] in EXTRACTED_TYPECODES)
+    except Exception:
+        return None
+
+def measure_startup(exe_path, runs):
+    """Mide el arranque con --startup-probe; la primera ejecución es en frío"""
+    times = []
+    with tempfile.TemporaryDirectory(prefix="rdr2_probe_") as appdata:
+        env = dict(os.environ, APPDATA=appdata)
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = subprocess.run([str(exe_path), "--startup-probe"], env=env,
+                                    capture_output=True, timeout=120)
+            if result.returncode != 0:
+                return None, None
+            times.append(time.perf_counter() - start)
+    warm = statistics.median(times[1:]) if len(times) > 1 else times[0]
+    return times[0], warm
+
+def matrix_variants(upx_available):
+    """Genera las combinaciones de la matriz de builds"""
+    for mode, upx, excludes in itertools.product(MATRIX_MODES, MATRIX_UPX, MATRIX_EXCLUDES):
+        if upx and not upx_available:
+            continue
+        yield {
+            "name": f"{mode}-{'upx' if upx else 'noupx'}-{excludes}",
+            "onefile": mode == "onefile",
+            "upx": upx,
+            "excludes": MATRIX_EXCLUDES[excludes],
+        }
+
+def build_variant(variant, runs):
+    """Compila y mide una variante (se ejecuta en un proceso aparte)"""
+    workdir = (MATRIX_DIR / variant["name"]).resolve()
+    if workdir.exists():
+        shutil.rmtree(workdir)
+    workdir.mkdir(parents=True)
+
+    cmd = pyinstaller_command(onefile=variant["onefile"], upx=variant["upx"],
+                              excludes=variant["excludes"], workdir=workdir)
+    cmd.append(str(Path(BUILD_CONFIG['source_file']).resolve()))
+
+    # Caché de PyInstaller propia para que los --clean en paralelo no se pisen
+    env = dict(os.environ, PYINSTALLER_CONFIG_DIR=str(workdir / "config"))
+    started = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    build_time = time.perf_counter() - started
+    row = {"name": variant["name"], "build_time": build_time, "ok": result.returncode == 0}
+    if not row["ok"]:
+        (workdir / "build.log").write_text(result.stdout + result.stderr, encoding="utf-8")
+        return row
+
+    if variant["onefile"]:
+        exe_path = workdir / "dist" / exe_name()
+        row["size"] = exe_path.stat().st_size
+        row["extracted"] = onefile_extracted_size(exe_path)
+    else:
+        exe_path = workdir / "dist" / BUILD_CONFIG['app_name'] / exe_name()
+        row["size"] = dir_size(exe_path.parent)
+        row["extracted"] = 0             # --onedir no extrae nada al arrancar
+
+    row["cold"], row["warm"] = measure_startup(exe_path, runs)
+    return row
+
+def format_mb(size):
+    return "n/d" if size is None else f"{size / (1024 * 1024):.2f} MB"
+
+def format_seconds(seconds):
+    return "n/d" if seconds is None else f"{seconds:.2f} s"
+
+def build_matrix(jobs, runs):
+    """Compila todas las variantes en paralelo y muestra la tabla comparativa"""
+    upx_available = shutil.which("upx") is not None or bool(os.environ.get("UPX_DIR"))
+    if not upx_available:
+        print("⚠️ UPX no encontrado: se omiten las variantes con UPX")
+
+    variants = list(matrix_variants(upx_available))
+    print(f"🧪 Compilando {len(variants)} variantes con {jobs} procesos...")
+
+    MATRIX_DIR.mkdir(parents=True, exist_ok=True)
+    rows = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(build_variant, variant, runs): variant for variant in variants}
+        for future in as_completed(futures):
+            row = future.result()
+            status = "✅" if row["ok"] else "❌"
+            print(f"{status} {row['name']} ({row['build_time']:.0f} s)")
+            rows.append(row)
+
+    rows.sort(key=lambda row: (not row["ok"], row.get("size") or 0))
+    header = "| Variante | Tamaño | Extraído | Arranque en frío | Arranque (mediana) |"
+    lines = [header, "|---|---:|---:|---:|---:|"]
+    for row in rows:
+        if not row["ok"]:
+            lines.append(f"| {row['name']} | ❌ error (ver build.log) | | | |")
+            continue
+        lines.append(f"| {row['name']} | {format_mb(row['size'])} | {format_mb(row['extracted'])} "
+                     f"| {format_seconds(row['cold'])} | {format_seconds(row['warm'])} |")
+
+    table = "\n".join(lines)
+    report_path = MATRIX_DIR / "MATRIX.md"
+    report_path.write_text(f"# Matriz de builds - {BUILD_CONFIG['app_name']}\n\n{table}\n", encoding="utf-8")
+    print("\n📊 Comparativa de variantes:")
+    print(table)
+    print(f"\n📄 Tabla guardada en: {report_path}")
+    return all(row["ok"] for row in rows)
+
+def bundled_modules(exe_path):
+    """Módulos Python y extensiones nativas incluidos en un ejecutable --onefile"""
+    from PyInstaller.archive.readers import CArchiveReader
+    reader = CArchiveReader(str(exe_path))
+    modules = set()
+    for name in reader.toc:
+        if name.endswith(".pyz"):
+            modules.update(reader.open_embedded_archive(name).toc)
+            continue
+        match = EXTENSION_RE.match(name)
+        if match:
+            modules.add(re.sub(r"[/\\]", ".", match.group(1)))
+    return modules
+
+def record_import_trace(exe_path, keep=TRIM_KEEP_MODULES):
+    """Ejecuta la app con --startup-probe y devuelve los módulos que importó.
+
+    La app importa además los módulos de `keep` antes de volcar la traza,
+    para que sus dependencias (p. ej. subprocess para webbrowser) no se excluyan.
+    """
+    with tempfile.TemporaryDirectory(prefix="rdr2_trace_") as tmp:
+        trace_path = Path(tmp) / "imports.json"
+        env = dict(os.environ, APPDATA=tmp, RDR2SM_IMPORT_TRACE=str(trace_path),
+                   RDR2SM_IMPORT_KEEP=",".join(keep))
+        result = subprocess.run([str(exe_path), "--startup-probe"], env=env,
+                                capture_output=True, timeout=120)
+        if result.returncode != 0 or not trace_path.exists():
+            return None
+        return set(json.loads(trace_path.read_text(encoding="utf-8")))
+
+def compute_excludes(bundled, traced, keep=TRIM_KEEP_MODULES):
+    """Lista mínima de --exclude-module: módulos incluidos que nunca se importaron.
+
+    Si un paquete entero no se usó se excluye solo el paquete, no cada submódulo.
+    """
+    def kept(module):
+        return any(module == k or module.startswith(k + ".") for k in keep)
+
+    unused = {m for m in bundled if m not in traced and not kept(m)}
+    excludes = []
+    for module in sorted(unused):
+        parent = module.rpartition(".")[0]
+        if parent and parent in unused:
+            continue
+        excludes.append(module)
+    return excludes
+
+def build_trim_variant(name, excludes):
+    """Compila una variante --onefile para el recorte y devuelve la ruta del ejecutable"""
+    workdir = (TRIM_DIR / name).resolve()
+    if workdir.exists():
+        shutil.rmtree(workdir)
+    workdir.mkdir(parents=True)
+    cmd = pyinstaller_command(onefile=True, excludes=excludes, workdir=workdir)
+    cmd.append(str(Path(BUILD_CONFIG['source_file']).resolve()))
+    env = dict(os.environ, PYINSTALLER_CONFIG_DIR=str(workdir / "config"))
+    result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        (workdir / "build.log").write_text(result.stdout + result.stderr, encoding="utf-8")
+        print(f"❌ Error compilando la variante '{name}' (ver {workdir / 'build.log'})")
+        return None
+    return workdir / "dist" / exe_name()
+
+def trim_build(runs):
+    """Compila, traza las importaciones reales y genera un build recortado verificado"""
+    print("🔨 Compilando build completo de referencia...")
+    full_exe = build_trim_variant("completo", [])
+    if full_exe is None:
+        return False
+
+    print("🔍 Registrando las importaciones de un arranque de la app...")
+    traced = record_import_trace(full_exe)
+    if traced is None:
+        print("❌ La app no pudo arrancar con --startup-probe para registrar la traza")
+        return False
+
+    bundled = bundled_modules(full_exe)
+    excludes = compute_excludes(bundled, traced)
+    excludes_path = TRIM_DIR / "excludes.txt"
+    excludes_path.write_text("\n".join(excludes) + "\n", encoding="utf-8")
+    print(f"📋 {len(bundled)} módulos incluidos, {len(traced)} importados, {len(excludes)} exclusiones "
+          f"(guardadas en {excludes_path})")
+
+    print("✂️ Compilando build recortado...")
+    trimmed_exe = build_trim_variant("recortado", excludes)
+    if trimmed_exe is None:
+        return False
+
+    # El build recortado debe seguir arrancando y volver a importar lo mismo
+    trimmed_traced = record_import_trace(trimmed_exe)
+    if trimmed_traced is None:
+        print("❌ El build recortado no arranca; revisa TRIM_KEEP_MODULES")
+        return False
+    missing = sorted(m for m in traced - trimmed_traced if m in bundled)
+    if missing:
+        print(f"❌ Módulos que ya no se importan en el build recortado: {', '.join(missing[:10])}")
+        print("   Añádelos a TRIM_KEEP_MODULES y vuelve a compilar")
+        return False
+    print("✅ El build recortado arranca correctamente")
+
+    rows = []
+    for label, exe_path in (("completo", full_exe), ("recortado", trimmed_exe)):
+        cold, warm = measure_startup(exe_path, runs)
+        rows.append({"name": label, "size": exe_path.stat().st_size,
+                     "extracted": onefile_extracted_size(exe_path), "cold": cold, "warm": warm})
+
+    full, trimmed = rows
+    lines = [
+        "| Build | Tamaño | Extraído | Arranque en frío | Arranque (mediana) |",
+        "|---|---:|---:|---:|---:|",
+    ]
+    for row in rows:
+        lines.append(f"| {row['name']} | {format_mb(row['size'])} | {format_mb(row['extracted'])} "
+                     f"| {format_seconds(row['cold'])} | {format_seconds(row['warm'])} |")
+
+    def saving(key):
+        if full[key] is None or trimmed[key] is None:
+            return "n/d"
+        return f"{full[key] - trimmed[key]:+.2f}" if isinstance(full[key], float) else format_mb(full[key] - trimmed[key])
+
+    lines.append(f"| **ahorro** | {saving('size')} | {saving('extracted')} | {saving('cold')} s | {saving('warm')} s |")
+    table = "\n".join(lines)
+    report_path = TRIM_DIR / "TRIM.md"
+    report_path.write_text(f"# Build recortado - {BUILD_CONFIG['app_name']}\n\n{table}\n\n"
+                           f"Exclusiones: {len(excludes)} (ver excludes.txt)\n", encoding="utf-8")
+    print("\n📊 Comparativa:")
+    print(table)
+    print(f"\n📦 Ejecutable recortado: {trimmed_exe}")
+    print(f"📄 Informe guardado en: {report_path}")
+    return True
+
+def positive_int(value):
+    """Tipo de argparse para --runs: al menos una ejecución"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"debe ser 1 o más (recibido {value})")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description="Build RDR2 Session Manager")
     parser.add_argument("--no-clean", action="store_true", 
@@ -227,6 +550,14 @@ def main():
                        help="Build en modo debug (con consola)")
     parser.add_argument("--check-only", action="store_true", 
                        help="Solo verificar requisitos")
+    parser.add_argument("--matrix", action="store_true",
+                       help="Compilar y comparar la matriz de configuraciones")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 2,
+                       help="Procesos en paralelo para --matrix")
+    parser.add_argument("--runs", type=positive_int, default=3,
+                       help="Arranques medidos por variante en --matrix y --trim")
+    parser.add_argument("--trim", action="store_true",
+                       help="Build recortado según las importaciones reales de la app")
     
     args = parser.parse_args()
     
@@ -239,6 +570,16 @@ def main():
     if args.check_only:
         print("✅ Verificación completada. Todo está listo para el build.")
         return
+
+    if args.matrix:
+        if not build_matrix(args.jobs, args.runs):
+            sys.exit(1)
+        return
+
+    if args.trim:
+        if not trim_build(args.runs):
+            sys.exit(1)
+        return
     
     # Compilar
     if not build_executable(clean=not args.no_clean, debug=args.debug):
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+RDR2 Session Manager - Fuzzing del validador de sesiones
+Genera entradas aleatorias y comprueba las garantías de SessionValidator
+y read_import_entries. Termina con código 1 si alguna se incumple.
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import argparse
+import xml.etree.ElementTree as ET
+
+from rdr2_core import (
+    SessionRecord,
+    SessionStore,
+    SessionValidator,
+    TemplateLibrary,
+    read_import_entries,
+)
+
+# Alfabeto con los casos conflictivos: XML, espacios, control, formato Unicode y formas NFKC
+SAFE_ALPHABET = list("abcXYZ019-_.:/+=ñé🎮")
+ALPHABET = (
+    SAFE_ALPHABET + list("<>&\"'") + [" ", "\t", "\n", "\r", "\x0b", "\x0c"]
+    + ["\x00", "\x1f", "\x7f", "\x85", "\x9f", "\xa0"]
+    + ["\u200b", "\u200e", "\u200f", "\u2028", "\u2029", "\u3000", "\ufeff", "\u202e"]
+    + ["e\u0301", "\ufb01", "\uff2b", "\u2460", "\xb2", "\ud800"]
+)
+ODD_VALUES = [None, 5, 1.5, True, [], {}, ["a", 1], {"x": "y"}]
+
+
+def random_text(rng, max_length=90):
+    length = rng.choice([0, 1, 2, rng.randint(0, 20), rng.randint(0, max_length)])
+    alphabet = SAFE_ALPHABET if rng.random() < 0.3 else ALPHABET
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def random_value(rng):
+    """Texto casi siempre; a veces un valor de otro tipo, como en un JSON malformado"""
+    return rng.choice(ODD_VALUES) if rng.random() < 0.1 else random_text(rng)
+
+
+def check_record(record, templates):
+    """Invariantes de un registro aceptado; devuelve una lista de fallos"""
+    failures = []
+    key = record.key
+    if not SessionValidator.KEY_RE.fullmatch(key) or not key.isprintable():
+        failures.append(f"clave aceptada no válida: {key!r}")
+    if not record.name or len(record.name) > SessionValidator.NAME_MAX_LENGTH or not record.name.isprintable():
+        failures.append(f"nombre aceptado no válido: {record.name!r}")
+    if not record.group.isprintable() or record.group != record.group.strip():
+        failures.append(f"grupo aceptado no válido: {record.group!r}")
+
+    # Normalizar de nuevo no cambia nada
+    again = SessionValidator(SessionStore()).build(record.name, record.key, record.group, record.tags)
+    if (again.name, again.key, again.group, again.tags) != (record.name, record.key, record.group, record.tags):
+        failures.append(f"la normalización no es idempotente: {record.name!r}")
+
+    # La clave va como texto tras el XML de startup.meta: no puede abrir marcado ni perder caracteres
+    try:
+        if ET.fromstring(b"<k>" + key.encode("utf-8") + b"</k>").text != key:
+            failures.append(f"la clave {key!r} cambia al leerla como texto XML")
+    except ET.ParseError as e:
+        failures.append(f"la clave {key!r} no es texto XML válido: {e}")
+    payload = templates.build("default", key)
+    if templates.detect(payload) != ("default", key):
+        failures.append(f"la clave {key!r} no se recupera de startup.meta")
+    return failures
+
+
+def fuzz_build(rng, iterations, templates):
+    """SessionValidator.build y check_key solo lanzan ValueError y nunca aceptan algo inválido"""
+    failures = []
+    accepted = 0
+    for _ in range(iterations):
+        name, key, group = random_value(rng), random_value(rng), random_value(rng)
+        tags = rng.choice([random_value(rng), [random_value(rng) for _ in range(rng.randint(0, 3))]])
+        try:
+            record = SessionValidator(SessionStore()).build(name, key, group, tags)
+        except ValueError:
+            record = None
+        except Exception as e:
+            failures.append(f"build({name!r}, {key!r}, {group!r}, {tags!r}) lanzó {type(e).__name__}: {e}")
+            continue
+
+        if isinstance(key, str):
+            try:
+                SessionValidator.check_key(key)
+                key_ok = True
+            except ValueError:
+                key_ok = False
+            except Exception as e:
+                failures.append(f"check_key({key!r}) lanzó {type(e).__name__}: {e}")
+                continue
+            if key_ok and not (SessionValidator.KEY_RE.fullmatch(key) and key.isprintable()):
+                failures.append(f"check_key aceptó {key!r}")
+
+        if record is not None:
+            accepted += 1
+            failures.extend(check_record(record, templates))
+    return accepted, failures
+
+
+def fuzz_stream(rng, iterations):
+    """validate_stream produce una tupla por entrada y no acepta nombres ni claves repetidos"""
+    failures = []
+    store = SessionStore.from_records([SessionRecord("existente", "clave-existente")])
+    pool_names = ["a", "A", "a ", "ａ", "existente"]
+    pool_keys = ["k1", "k1 ", "ｋ1", "clave-existente"]
+    entries = []
+    for _ in range(iterations):
+        kind = rng.random()
+        if kind < 0.05:
+            entries.append(rng.choice(ODD_VALUES))
+        elif kind < 0.5:
+            entries.append({"name": rng.choice(pool_names), "key": rng.choice(pool_keys)})
+        else:
+            entries.append({"name": random_value(rng), "key": random_value(rng),
+                            "group": random_value(rng), "tags": random_value(rng)})
+    try:
+        results = list(SessionValidator(store).validate_stream(iter(entries)))
+    except Exception as e:
+        return [f"validate_stream lanzó {type(e).__name__}: {e}"]
+
+    if [number for number, _, _ in results] != list(range(1, len(entries) + 1)):
+        failures.append("validate_stream no devolvió una tupla por entrada")
+    accepted = [record for _, record, _ in results if record is not None]
+    names = [record.name for record in accepted] + ["existente"]
+    keys = [record.key for record in accepted] + ["clave-existente"]
+    if len(set(names)) != len(names):
+        failures.append("validate_stream aceptó nombres repetidos")
+    if len(set(keys)) != len(keys):
+        failures.append("validate_stream aceptó claves repetidas")
+    for _, record, error in results:
+        if (record is None) == (error is None):
+            failures.append("cada entrada debe tener registro o error, no ambos")
+    return failures
+
+
+def fuzz_import_files(rng, iterations, workdir):
+    """read_import_entries + validate_stream solo fallan con los errores que captura la app"""
+    failures = []
+    shapes = [
+        lambda: {random_text(rng, 10): random_value(rng) for _ in range(3)},
+        lambda: {"sessions": {random_text(rng, 10): {"key": random_value(rng), "tags": random_value(rng)}}},
+        lambda: {"sessions": random_value(rng)},
+        lambda: [random_value(rng)],
+        lambda: random_value(rng),
+    ]
+    for index in range(iterations):
+        if rng.random() < 0.5:
+            path = os.path.join(workdir, f"{index}.json")
+            with open(path, 'w', encoding='utf-8', errors='surrogatepass') as f:
+                json.dump(rng.choice(shapes)(), f)
+        else:
+            path = os.path.join(workdir, f"{index}.csv")
+            with open(path, 'w', encoding='utf-8', errors='surrogatepass', newline='') as f:
+                for _ in range(rng.randint(0, 4)):
+                    f.write(",".join(random_text(rng, 12) for _ in range(rng.randint(1, 5))) + "\n")
+        try:
+            list(SessionValidator(SessionStore()).validate_stream(read_import_entries(path)))
+        except (OSError, ValueError, TypeError, AttributeError):
+            # Son los que captura RDR2SessionManager.import_sessions
+            pass
+        except Exception as e:
+            failures.append(f"{os.path.basename(path)}: {type(e).__name__}: {e}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzzing del validador de sesiones")
+    parser.add_argument("--iterations", type=int, default=20000, help="Entradas por prueba")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla (por defecto, aleatoria)")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    print(f"🎲 Semilla {seed}, {args.iterations:,} entradas por prueba")
+
+    workdir = tempfile.mkdtemp(prefix="rdr2_fuzz_")
+    try:
+        templates = TemplateLibrary(os.path.join(workdir, "templates"))
+        accepted, failures = fuzz_build(rng, args.iterations, templates)
+        print(f"🔑 build/check_key: {accepted:,} aceptadas, {len(failures)} fallos")
+        stream_failures = fuzz_stream(rng, args.iterations)
+        print(f"📥 validate_stream: {len(stream_failures)} fallos")
+        import_failures = fuzz_import_files(rng, max(1, args.iterations // 20), workdir)
+        print(f"📄 read_import_entries: {len(import_failures)} fallos")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failures += stream_failures + import_failures
+    for failure in failures[:20]:
+        print(f"❌ {failure}")
+    if failures:
+        print(f"❌ {len(failures)} fallos (repite con --seed {seed})")
+        return 1
+    print("✅ Sin fallos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
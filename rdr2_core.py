@@ -0,0 +1,1151 @@
+"""
+RDR2 Session Manager - Núcleo sin interfaz
+Plantillas de startup.meta, almacén y validación de sesiones, bóveda cifrada,
+versiones anteriores y escritura de startup.meta. No importa tkinter: lo usan
+la aplicación, el modo flota y las herramientas de línea de comandos.
+"""
+
+import os
+import json
+import sys
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None  # La bóveda cifrada es opcional (pip install cryptography)
+import time
+import base64
+import hashlib
+import hmac
+import re
+import zlib
+import csv
+import unicodedata
+import io
+from collections import OrderedDict
+from xml.etree import ElementTree
+
+
+# Plantilla integrada de startup.meta; la clave de sesión va tras la etiqueta de cierre
+DEFAULT_PROFILE = "default"
+SESSION_KEY_PLACEHOLDER = "{session_key}"
+STARTUP_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<CDataFileMgr__ContentsOfDataFileXml>
+ <disabledFiles />
+ <includedXmlFiles itemType="CDataFileMgr__DataFileArray" />
+ <includedDataFiles />
+ <dataFiles itemType="CDataFileMgr__DataFile">
+  <Item>
+   <filename>platform:/data/cdimages/scaleform_platform_pc.rpf</filename>
+   <fileType>RPF_FILE</fileType>
+  </Item>
+  <Item>
+   <filename>platform:/data/ui/value_conversion.rpf</filename>
+   <fileType>RPF_FILE</fileType>
+  </Item>
+  <Item>
+   <filename>platform:/data/ui/widgets.rpf</filename>
+   <fileType>RPF_FILE</fileType>
+  </Item>
+  <Item>
+   <filename>platform:/textures/ui/ui_photo_stickers.rpf</filename>
+   <fileType>RPF_FILE</fileType>
+  </Item>
+  <Item>
+   <filename>platform:/textures/ui/ui_platform.rpf</filename>
+   <fileType>RPF_FILE</fileType>
+  </Item>
+  <Item>
+   <filename>platform:/data/ui/stylesCatalog</filename>
+   <fileType>aWeaponizeDisputants</fileType> <!-- collision -->
+  </Item>
+  <Item>
+   <filename>platform:/data/cdimages/scaleform_frontend.rpf</filename>
+   <fileType>RPF_FILE_PRE_INSTALL</fileType>
+  </Item>
+  <Item>
+   <filename>platform:/textures/ui/ui_startup_textures.rpf</filename>
+   <fileType>RPF_FILE</fileType>
+  </Item>
+  <Item>
+   <filename>platform:/data/ui/startup_data.rpf</filename>
+   <fileType>RPF_FILE</fileType>
+  </Item>
+ </dataFiles>
+ <contentChangeSets itemType="CDataFileMgr__ContentChangeSet" />
+ <patchFiles />
+</CDataFileMgr__ContentsOfDataFileXml>{session_key}"""
+
+
+class CompiledTemplate:
+    """Plantilla validada y partida en prefijo/sufijo ya codificados"""
+
+    def __init__(self, name, prefix, suffix, mtime=None):
+        self.name = name
+        self.prefix = prefix
+        self.suffix = suffix
+        self.mtime = mtime
+
+    def build(self, session_key):
+        return self.prefix + session_key.encode("utf-8") + self.suffix
+
+    def match(self, content):
+        """Devuelve la clave si `content` fue generado con esta plantilla, o None"""
+        if (len(content) >= len(self.prefix) + len(self.suffix)
+                and content.startswith(self.prefix) and content.endswith(self.suffix)):
+            return content[len(self.prefix):len(content) - len(self.suffix)].decode("utf-8")
+        return None
+
+
+def compile_template(name, text, mtime=None):
+    """Valida una plantilla de startup.meta y la compila a bytes (prefijo, sufijo)"""
+    if text.count(SESSION_KEY_PLACEHOLDER) != 1:
+        raise ValueError(f"La plantilla '{name}' debe contener {SESSION_KEY_PLACEHOLDER} exactamente una vez")
+    try:
+        ElementTree.fromstring(text.replace(SESSION_KEY_PLACEHOLDER, "").encode("utf-8"))
+    except ElementTree.ParseError as e:
+        raise ValueError(f"La plantilla '{name}' no es XML válido: {e}")
+
+    # Mismos bytes que escribiría el modo texto en esta plataforma
+    prefix, suffix = text.replace("\r\n", "\n").split(SESSION_KEY_PLACEHOLDER)
+    return CompiledTemplate(
+        name,
+        prefix.replace("\n", os.linesep).encode("utf-8"),
+        suffix.replace("\n", os.linesep).encode("utf-8"),
+        mtime,
+    )
+
+
+class TemplateLibrary:
+    """Perfiles de plantilla cargados desde archivos *.meta con caché por mtime.
+
+    Cada archivo se valida y compila una sola vez; si su fecha de
+    modificación cambia se vuelve a compilar en el siguiente acceso.
+    """
+
+    EXTENSION = ".meta"
+
+    def __init__(self, directory, default_template=STARTUP_TEMPLATE):
+        self.directory = directory
+        self.default = compile_template(DEFAULT_PROFILE, default_template)
+        self.cache = {}              # nombre -> CompiledTemplate
+        self.errors = {}             # nombre -> mensaje de la última compilación fallida
+
+    def path_for(self, name):
+        """Ruta del perfil; solo se aceptan nombres de archivo dentro de la carpeta de plantillas"""
+        if (not isinstance(name, str) or not name or name in (".", "..")
+                or os.path.basename(name) != name or "/" in name or "\\" in name):
+            raise ValueError(f"Nombre de plantilla no válido: {name!r}")
+        return os.path.join(self.directory, name + self.EXTENSION)
+
+    def get(self, name):
+        """Devuelve la plantilla compilada; lanza ValueError si no existe o no es válida"""
+        if name == DEFAULT_PROFILE:
+            return self.default
+        path = self.path_for(name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.cache.pop(name, None)
+            raise ValueError(f"No existe la plantilla '{name}'")
+
+        compiled = self.cache.get(name)
+        if compiled is not None and compiled.mtime == mtime:
+            return compiled
+
+        self.cache.pop(name, None)
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        try:
+            compiled = compile_template(name, text, mtime)
+        except ValueError as e:
+            self.errors[name] = str(e)
+            raise
+        self.errors.pop(name, None)
+        self.cache[name] = compiled
+        return compiled
+
+    def names(self):
+        """Perfiles disponibles y válidos, empezando por el integrado"""
+        names = [DEFAULT_PROFILE]
+        if os.path.isdir(self.directory):
+            for filename in sorted(os.listdir(self.directory)):
+                name, ext = os.path.splitext(filename)
+                if ext != self.EXTENSION or name == DEFAULT_PROFILE:
+                    continue
+                try:
+                    self.get(name)
+                    names.append(name)
+                except ValueError:
+                    pass
+        return names
+
+    def build(self, name, session_key):
+        return self.get(name).build(session_key)
+
+    def detect(self, content):
+        """Identifica (perfil, clave) de un startup.meta leído una sola vez"""
+        candidates = [self.default] + [self.cache[name] for name in self.names()[1:]]
+        # Los prefijos más largos primero para no confundir perfiles que se solapan
+        for template in sorted(candidates, key=lambda t: len(t.prefix) + len(t.suffix), reverse=True):
+            key = template.match(content)
+            if key is not None:
+                return template.name, key
+        return None, None
+
+
+class PayloadCache:
+    """Caché LRU acotada de payloads de startup.meta ya codificados"""
+
+    def __init__(self, builder, maxsize=16):
+        self.builder = builder            # builder(clave_de_caché) -> bytes
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, cache_key):
+        payload = self.entries.get(cache_key)
+        if payload is None:
+            payload = self.builder(cache_key)
+            self.entries[cache_key] = payload
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(cache_key)
+        return payload
+
+
+class SessionRecord:
+    """Sesión guardada con sus metadatos (etiquetas, grupo y uso).
+
+    Es la única copia de los datos de la sesión: los índices del almacén y
+    las filas de la tabla solo guardan el nombre. Con `__slots__` no hay un
+    dict por registro, y clave, grupo, etiquetas y plantilla se internan para
+    que los valores repetidos compartan una sola cadena.
+    """
+
+    __slots__ = ("name", "key", "tags", "group", "last_used", "use_count", "profile")
+
+    def __init__(self, name, key, tags=(), group="", last_used=0.0, use_count=0, profile=DEFAULT_PROFILE):
+        self.name = name
+        self.key = sys.intern(key)
+        self.tags = tuple(sys.intern(tag) for tag in tags)
+        self.group = sys.intern(group)
+        self.last_used = last_used
+        self.use_count = use_count
+        self.profile = sys.intern(profile)
+
+    @classmethod
+    def from_dict(cls, name, data):
+        """Crea un registro desde el JSON (acepta el formato antiguo nombre -> clave)"""
+        if isinstance(data, str):
+            return cls(name, data)
+        return cls(
+            name,
+            data["key"],
+            tags=data.get("tags", ()),
+            group=data.get("group", ""),
+            last_used=data.get("last_used", 0.0),
+            use_count=data.get("use_count", 0),
+            profile=data.get("profile", DEFAULT_PROFILE),
+        )
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "tags": list(self.tags),
+            "group": self.group,
+            "last_used": self.last_used,
+            "use_count": self.use_count,
+            "profile": self.profile,
+        }
+
+
+class SessionStore:
+    """Colección de sesiones con índices secundarios por clave, etiqueta, grupo y uso reciente.
+
+    Los índices se mantienen de forma incremental para que las vistas
+    filtradas y las operaciones masivas sean O(k) en el tamaño del resultado.
+    """
+
+    def __init__(self):
+        self.records = {}                # nombre -> SessionRecord
+        self.by_key = {}                 # clave -> nombre, o {nombre: None} si se repite
+        self.by_tag = {}                 # etiqueta -> {nombre: None} (conjunto ordenado)
+        self.by_group = {}               # grupo -> {nombre: None}
+        self.recent = {}                 # nombre -> None, del más antiguo al más reciente
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def get(self, name):
+        return self.records.get(name)
+
+    def add(self, record):
+        """Agrega un registro y lo indexa"""
+        if record.name in self.records:
+            raise KeyError(record.name)
+        self.records[record.name] = record
+        # Casi todas las claves son únicas: se guarda el nombre sin un dict por clave
+        names = self.by_key.setdefault(record.key, record.name)
+        if names is not record.name:
+            if isinstance(names, str):
+                names = self.by_key[record.key] = {names: None}
+            names[record.name] = None
+        for tag in record.tags:
+            self.by_tag.setdefault(tag, {})[record.name] = None
+        if record.group:
+            self.by_group.setdefault(record.group, {})[record.name] = None
+        if record.use_count:
+            self.recent[record.name] = None
+
+    def remove(self, name):
+        """Elimina un registro y lo quita de todos los índices"""
+        record = self.records.pop(name)
+        names = self.by_key[record.key]
+        if isinstance(names, str):
+            del self.by_key[record.key]
+        else:
+            del names[name]
+            if len(names) == 1:
+                self.by_key[record.key] = next(iter(names))
+        for tag in record.tags:
+            self._unindex(self.by_tag, tag, name)
+        if record.group:
+            self._unindex(self.by_group, record.group, name)
+        self.recent.pop(name, None)
+        return record
+
+    @staticmethod
+    def _unindex(index, value, name):
+        names = index[value]
+        del names[name]
+        if not names:
+            del index[value]
+
+    def touch(self, name, when=None):
+        """Registra un uso de la sesión y la mueve al frente de recientes en O(1)"""
+        record = self.records[name]
+        record.last_used = time.time() if when is None else when
+        record.use_count += 1
+        self.recent.pop(name, None)
+        self.recent[name] = None
+        return record
+
+    def most_recent(self, limit=None):
+        """Devuelve las sesiones usadas, de la más reciente a la más antigua"""
+        result = []
+        for name in reversed(self.recent):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self.records[name])
+        return result
+
+    def with_key(self, key):
+        names = self.by_key.get(key, ())
+        if isinstance(names, str):
+            return [self.records[names]]
+        return [self.records[name] for name in names]
+
+    def with_tag(self, tag):
+        return [self.records[name] for name in self.by_tag.get(tag, ())]
+
+    def in_group(self, group):
+        return [self.records[name] for name in self.by_group.get(group, ())]
+
+    def tags(self):
+        return sorted(self.by_tag)
+
+    def groups(self):
+        return sorted(self.by_group)
+
+    def remove_many(self, names):
+        """Elimina varias sesiones y devuelve los registros eliminados"""
+        return [self.remove(name) for name in list(names)]
+
+    def to_dict(self):
+        return {name: record.to_dict() for name, record in self.records.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls.from_records([SessionRecord.from_dict(name, value) for name, value in data.items()])
+
+    @classmethod
+    def from_records(cls, records):
+        """Construye el almacén; el índice de recientes se ordena una sola vez al cargar"""
+        store = cls()
+        for record in records:
+            store.add(record)
+        store.recent = {
+            record.name: None
+            for record in sorted(records, key=lambda r: r.last_used)
+            if record.use_count
+        }
+        return store
+
+
+class SessionValidator:
+    """Valida y normaliza sesiones nuevas antes de agregarlas al almacén.
+
+    La clave se escribe tal cual tras la etiqueta de cierre de startup.meta,
+    así que no puede contener espacios, caracteres de control ni caracteres
+    especiales de XML. Los duplicados se detectan en O(1) con los índices
+    del almacén y, en importaciones masivas, con los vistos en el mismo lote.
+    """
+
+    KEY_MAX_LENGTH = 64
+    NAME_MAX_LENGTH = 80
+    KEY_RE = re.compile(r"[^\s<>&\"'\x00-\x1f\x7f-\x9f]{1,%d}" % KEY_MAX_LENGTH)
+    KEY_FORBIDDEN_RE = re.compile(r"[\s<>&\"'\x00-\x1f\x7f-\x9f]")
+    SPACES_RE = re.compile(r"\s+")
+    TAG_SEPARATOR_RE = re.compile(r"[,;]")
+
+    def __init__(self, store):
+        self.store = store
+
+    def normalize_text(self, text):
+        """NFKC, sin espacios en los extremos y espacios internos colapsados"""
+        return self.SPACES_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+    def normalize_key(self, key):
+        return unicodedata.normalize("NFKC", key).strip()
+
+    @classmethod
+    def check_key(cls, key):
+        """Lanza ValueError si la clave no se puede escribir en startup.meta"""
+        if not cls.KEY_RE.fullmatch(key):
+            if len(key) > cls.KEY_MAX_LENGTH:
+                raise ValueError(f"La clave no puede superar {cls.KEY_MAX_LENGTH} caracteres")
+            if not key:
+                raise ValueError("La clave está vacía")
+            bad = cls.KEY_FORBIDDEN_RE.search(key).group()
+            raise ValueError(f"La clave contiene un carácter no permitido: {bad!r}")
+        if not key.isprintable():
+            # Caracteres invisibles (de formato, separadores Unicode...) que el regex no cubre
+            raise ValueError("La clave contiene caracteres no imprimibles")
+
+    def build(self, name, key, group="", tags=(), profile=DEFAULT_PROFILE, seen_names=None, seen_keys=None):
+        """Devuelve un SessionRecord normalizado o lanza ValueError con el motivo"""
+        if not isinstance(tags, (str, list, tuple, dict)) or not all(
+                isinstance(value, str) for value in (name, key, group, profile, *tags)):
+            raise ValueError("La entrada tiene campos con un tipo no válido")
+        name = self.normalize_text(name)
+        key = self.normalize_key(key)
+        group = self.normalize_text(group)
+        if isinstance(tags, str):
+            tags = self.TAG_SEPARATOR_RE.split(tags)
+        tags = [tag for tag in (self.normalize_text(tag) for tag in tags) if tag]
+
+        if not name or not key:
+            raise ValueError("Debe ingresar tanto el nombre como la clave de la sesión")
+        if len(name) > self.NAME_MAX_LENGTH:
+            raise ValueError(f"El nombre no puede superar {self.NAME_MAX_LENGTH} caracteres")
+        if not name.isprintable() or not group.isprintable():
+            raise ValueError("El nombre o el grupo contienen caracteres no imprimibles")
+        self.check_key(key)
+
+        if name in self.store or (seen_names is not None and name in seen_names):
+            raise ValueError(f"Ya existe una sesión con el nombre '{name}'")
+        existing = self.store.with_key(key)
+        if existing:
+            raise ValueError(f"La clave ya está guardada en la sesión '{existing[0].name}'")
+        if seen_keys is not None and key in seen_keys:
+            raise ValueError(f"La clave está repetida en la importación (sesión '{seen_keys[key]}')")
+
+        return SessionRecord(name, key, tags=dict.fromkeys(tags), group=group, profile=profile)
+
+    def validate_stream(self, entries):
+        """Valida un flujo de entradas (dicts con name/key/group/tags/profile) sin cargarlo entero.
+
+        Produce (número, SessionRecord o None, error o None) por entrada.
+        """
+        seen_names = set()
+        seen_keys = {}
+        for number, entry in enumerate(entries, start=1):
+            try:
+                record = self.build(
+                    entry.get("name") or "",
+                    entry.get("key") or "",
+                    group=entry.get("group") or "",
+                    tags=entry.get("tags") or (),
+                    profile=entry.get("profile") or DEFAULT_PROFILE,
+                    seen_names=seen_names,
+                    seen_keys=seen_keys,
+                )
+            except (ValueError, TypeError, AttributeError) as e:
+                yield number, None, str(e)
+                continue
+            seen_names.add(record.name)
+            seen_keys[record.key] = record.name
+            yield number, record, None
+
+
+def read_import_entries(path):
+    """Lee de forma incremental un archivo de importación (JSON exportado o CSV/TXT)"""
+    if path.lower().endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("El archivo JSON no contiene un objeto de sesiones")
+        if isinstance(data.get("sessions"), dict):
+            data = data["sessions"]
+        for name, value in data.items():
+            if isinstance(value, dict):
+                yield dict(value, name=name)
+            else:
+                # Los valores que no son texto se rechazan al validar la entrada
+                yield {"name": name, "key": value}
+        return
+
+    # CSV/TXT: nombre,clave[,grupo[,etiquetas separadas por ;]]
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            fields = row + [""] * (4 - len(row))
+            yield {"name": fields[0], "key": fields[1], "group": fields[2], "tags": fields[3]}
+
+
+class JsonSessionBackend:
+    """Almacenamiento de sesiones en texto plano (rdr2_sessions.json) con verificación.
+
+    Formato: una línea de cabecera, una línea por sesión con su CRC32
+    ("crc json") y una línea final con el número de registros, la posición
+    donde empieza y el CRC32 de todo el cuerpo. Al abrir solo se comprueban
+    la cabecera y el final (más un CRC del cuerpo en una sola llamada); si algo
+    no cuadra se recuperan en una única pasada todos los registros válidos.
+    """
+
+    FORMAT = "rdr2-sessions"
+    VERSION = 3
+    # "nombre": "clave" (formato 1) o "nombre": {...} (formato 2) dentro de un JSON dañado
+    LEGACY_SKIP = frozenset(("sessions", "version", "key", "tags", "group", "last_used", "use_count", "profile"))
+    LEGACY_RECORD_RE = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*(\{[^{}]*\}|"(?:[^"\\]|\\.)*")')
+
+    def __init__(self, path):
+        self.path = path
+        self.report = None               # {"recovered": n, "damaged": k} si hubo que recuperar
+        self.load_error = None           # error de lectura: no se guarda hasta cargar bien el archivo
+
+    def load(self):
+        self.report = None
+        if not os.path.exists(self.path):
+            self.load_error = None
+            return SessionStore()
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if not data.strip():
+                store = SessionStore()   # archivo vacío: no hay nada que recuperar
+            else:
+                store = self._load_verified(data)
+                if store is None:
+                    store = self.salvage()
+        except OSError as e:
+            # Reescribir ahora sustituiría el archivo real por un almacén vacío
+            self.load_error = e
+            raise
+        self.load_error = None
+        return store
+
+    def _load_verified(self, data):
+        """Camino rápido: cabecera y final válidos; devuelve None si hay que recuperar"""
+        try:
+            if data.startswith(b"{") and not data.startswith(b'{"format"'):
+                return self._load_legacy(json.loads(data.decode('utf-8')))
+
+            header_end = data.index(b"\n")
+            header = json.loads(data[:header_end])
+            trailer_start = data.rindex(b"\n", 0, len(data) - 1) + 1
+            trailer = json.loads(data[trailer_start:])
+            if (header.get("format") != self.FORMAT or not trailer.get("end")
+                    or trailer["count"] != header["count"] or trailer["bytes"] != trailer_start):
+                return None
+
+            body = data[header_end + 1:trailer_start]
+            if zlib.crc32(body) != trailer["crc"]:
+                return None
+            # Se recorre el cuerpo sin partirlo en una lista de líneas para no duplicar el archivo en memoria
+            records = [self._decode(json.loads(line[9:])) for line in io.BytesIO(body)]
+            if len(records) != header["count"]:
+                return None
+            return SessionStore.from_records(records)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def _load_legacy(self, data):
+        # Formato 2: {"version": 2, "sessions": {...}}; formato 1: {nombre: clave}
+        if isinstance(data.get("sessions"), dict):
+            data = data["sessions"]
+        records = []
+        damaged = 0
+        for name, value in data.items():
+            if name == "version" and not isinstance(value, (str, dict)):
+                continue
+            try:
+                records.append(SessionRecord.from_dict(name, value))
+            except (KeyError, TypeError, AttributeError):
+                damaged += 1             # el JSON es válido pero esta entrada no es una sesión
+        if damaged:
+            self.report = {"recovered": len(records), "damaged": damaged}
+        return SessionStore.from_records(records)
+
+    @staticmethod
+    def _decode(data):
+        return SessionRecord.from_dict(data.pop("name"), data)
+
+    def salvage(self):
+        """Recupera en una sola pasada todos los registros válidos de un archivo dañado"""
+        store = SessionStore()
+        recovered = damaged = 0
+        with open(self.path, 'rb') as f:
+            first = f.read(16)
+            f.seek(0)
+            if first.startswith(b"{") and not first.startswith(b'{"format"'):
+                text = f.read().decode('utf-8', errors='replace')
+                records = self._salvage_legacy(text)
+            else:
+                records = self._salvage_lines(f)
+            for record in records:
+                if record is None or record.name in store:
+                    damaged += 1
+                    continue
+                store.add(record)
+                recovered += 1
+        if recovered or damaged:
+            self.report = {"recovered": recovered, "damaged": damaged}
+        return store
+
+    def _salvage_lines(self, lines):
+        for line in lines:
+            line = line.rstrip(b"\r\n")
+            if not line or line.startswith(b"{"):
+                continue                 # cabecera, final o línea vacía
+            try:
+                crc, payload = line.split(b" ", 1)
+                if int(crc, 16) != zlib.crc32(payload):
+                    raise ValueError("CRC incorrecto")
+                yield self._decode(json.loads(payload))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                yield None
+
+    def _salvage_legacy(self, text):
+        for match in self.LEGACY_RECORD_RE.finditer(text):
+            try:
+                name = json.loads(f'"{match.group(1)}"')
+                value = json.loads(match.group(2))
+                if name in self.LEGACY_SKIP or (isinstance(value, dict) and "key" not in value):
+                    continue
+                yield SessionRecord.from_dict(name, value)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                yield None
+
+    def commit(self, store, changed=(), removed=()):
+        """Reescribe el archivo completo de forma atómica (el JSON no admite cambios parciales)"""
+        if self.load_error is not None:
+            raise OSError(f"El archivo de sesiones no se pudo leer ({self.load_error}); "
+                          f"no se guardarán cambios hasta poder cargarlo")
+        body = bytearray()
+        for record in store:
+            payload = json.dumps({"name": record.name, **record.to_dict()}, ensure_ascii=False).encode('utf-8')
+            body += b"%08x " % zlib.crc32(payload) + payload + b"\n"
+        header = json.dumps({"format": self.FORMAT, "version": self.VERSION, "count": len(store)}).encode() + b"\n"
+        trailer = json.dumps({"end": True, "count": len(store), "bytes": len(header) + len(body),
+                              "crc": zlib.crc32(body)}).encode() + b"\n"
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header + body + trailer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class VaultError(Exception):
+    """Error al abrir o escribir la bóveda cifrada"""
+
+
+class DerivedKeyCache:
+    """Guarda en memoria la clave derivada de la contraseña durante un tiempo limitado.
+
+    El plazo se renueva con cada uso; al vencer, la clave se descarta y habrá
+    que volver a introducir la contraseña.
+    """
+
+    def __init__(self, timeout=900):
+        self.timeout = timeout
+        self._key = None
+        self._salt = None
+        self._expires = 0.0
+
+    def get(self, salt):
+        if self._key is None or self._salt != salt or time.monotonic() > self._expires:
+            self.clear()
+            return None
+        self._expires = time.monotonic() + self.timeout
+        return self._key
+
+    def set(self, salt, key):
+        self._salt = salt
+        self._key = key
+        self._expires = time.monotonic() + self.timeout
+
+    def clear(self):
+        self._key = None
+        self._salt = None
+        self._expires = 0.0
+
+
+class SessionVault:
+    """Almacenamiento cifrado de sesiones con un registro AES-GCM por línea.
+
+    El archivo es un log de líneas JSON: una cabecera con la sal de scrypt y
+    una comprobación de la contraseña, seguida de un registro cifrado por
+    sesión. Agregar, actualizar o eliminar una sesión añade una sola línea, y
+    leer una sesión solo descifra su línea. Cuando el log acumula demasiadas
+    líneas obsoletas se compacta reescribiéndolo.
+
+    De la clave de scrypt se derivan con HKDF dos subclaves: una para cifrar
+    y otra para los identificadores. Las bóvedas de la versión 1 usaban la
+    misma clave para todo y se actualizan al abrirlas.
+    """
+
+    FORMAT = "rdr2-vault"
+    VERSION = 2
+    SCRYPT_N = 2 ** 14
+    CHECK = b"rdr2-session-vault"
+    COMPACT_MIN_GARBAGE = 64
+
+    def __init__(self, path, key_cache, ask_password):
+        if AESGCM is None:
+            raise VaultError("La bóveda cifrada necesita el paquete 'cryptography'")
+        self.path = path
+        self.key_cache = key_cache
+        self.ask_password = ask_password      # ask_password() -> str o None
+        self.header = None
+        self.entries = {}                     # id -> línea JSON del registro vigente
+        self.garbage = 0
+        self.report = None                    # {"recovered": n, "damaged": k} si hubo líneas dañadas
+
+    @classmethod
+    def derive_key(cls, password, salt):
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=cls.SCRYPT_N,
+                              r=8, p=1, maxmem=64 * 1024 * 1024, dklen=32)
+
+    @staticmethod
+    def _hkdf(key, info):
+        """HKDF-SHA256 (RFC 5869) con sal vacía y 32 bytes de salida"""
+        prk = hmac.new(bytes(32), key, hashlib.sha256).digest()
+        return hmac.new(prk, info + b"\x01", hashlib.sha256).digest()
+
+    @classmethod
+    def subkeys(cls, key, version=VERSION):
+        """(clave de cifrado, clave de identificadores) derivadas de la clave de scrypt"""
+        if version < 2:
+            return key, key
+        return cls._hkdf(key, b"rdr2-vault enc"), cls._hkdf(key, b"rdr2-vault id")
+
+    @staticmethod
+    def _b64(data):
+        return base64.b64encode(data).decode('ascii')
+
+    @classmethod
+    def _seal(cls, key, plaintext, aad):
+        nonce = os.urandom(12)
+        return cls._b64(nonce + AESGCM(key).encrypt(nonce, plaintext, aad))
+
+    @staticmethod
+    def _open(key, sealed, aad):
+        raw = base64.b64decode(sealed)
+        return AESGCM(key).decrypt(raw[:12], raw[12:], aad)
+
+    @staticmethod
+    def record_id(key, name):
+        """Identificador estable de una sesión que no revela su nombre"""
+        return hmac.new(key, b"id:" + name.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+    @classmethod
+    def create(cls, path, password, store, key_cache, ask_password):
+        """Crea una bóveda nueva con todas las sesiones del almacén"""
+        vault = cls(path, key_cache, ask_password)
+        salt = os.urandom(16)
+        key = cls.derive_key(password, salt)
+        vault.header = {
+            "format": cls.FORMAT,
+            "version": cls.VERSION,
+            "kdf": {"name": "scrypt", "n": cls.SCRYPT_N, "r": 8, "p": 1, "subkeys": "hkdf-sha256"},
+            "salt": cls._b64(salt),
+            "check": cls._seal(cls.subkeys(key)[0], cls.CHECK, b"check"),
+        }
+        key_cache.set(salt, key)
+        vault.compact(store)
+        return vault
+
+    def _salt(self):
+        return base64.b64decode(self.header["salt"])
+
+    def _version(self):
+        return self.header.get("version", 1)
+
+    def key(self):
+        """Devuelve la clave derivada, pidiendo la contraseña si no está en caché"""
+        salt = self._salt()
+        key = self.key_cache.get(salt)
+        if key is not None:
+            return key
+        password = self.ask_password()
+        if password is None:
+            raise VaultError("Bóveda bloqueada")
+        key = self.derive_key(password, salt)
+        try:
+            self._open(self.subkeys(key, self._version())[0], self.header["check"], b"check")
+        except Exception:
+            raise VaultError("Contraseña incorrecta")
+        self.key_cache.set(salt, key)
+        return key
+
+    def keys(self):
+        """(clave de cifrado, clave de identificadores) de esta bóveda"""
+        return self.subkeys(self.key(), self._version())
+
+    def _encode(self, keys, record):
+        enc_key, id_key = keys
+        record_id = self.record_id(id_key, record.name)
+        payload = json.dumps({"name": record.name, **record.to_dict()}).encode('utf-8')
+        return record_id, json.dumps({"id": record_id, "data": self._seal(enc_key, payload, record_id.encode())})
+
+    def _decode(self, enc_key, line):
+        entry = json.loads(line)
+        data = json.loads(self._open(enc_key, entry["data"], entry["id"].encode()))
+        return SessionRecord.from_dict(data.pop("name"), data)
+
+    @classmethod
+    def _tombstone(cls, enc_key, record_id):
+        # AAD distinta a la de los registros: un registro copiado no sirve como borrado
+        return json.dumps({"id": record_id, "deleted": True,
+                           "data": cls._seal(enc_key, b"deleted", b"deleted:" + record_id.encode())})
+
+    def _check_tombstone(self, enc_key, entry):
+        if self._version() < 2:
+            return True                  # la versión 1 no autenticaba los borrados
+        try:
+            return self._open(enc_key, entry["data"], b"deleted:" + entry["id"].encode()) == b"deleted"
+        except Exception:
+            return False
+
+    def load(self):
+        """Lee el log; solo se conserva la última línea de cada sesión.
+
+        Cada línea, también las de borrado, está autenticada por AES-GCM con
+        su id como datos asociados, así que las líneas dañadas o alteradas
+        (por ejemplo, una escritura cortada) se descartan sin perder el resto.
+        Una bóveda de la versión 1 se reescribe en el formato actual.
+        """
+        self.entries = {}
+        self.garbage = 0
+        self.report = None
+        damaged = 0
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            try:
+                self.header = json.loads(f.readline())
+            except ValueError:
+                raise VaultError("La cabecera de la bóveda está dañada")
+            if not isinstance(self.header, dict) or self.header.get("format") != self.FORMAT:
+                raise VaultError("El archivo no es una bóveda de sesiones")
+            if self._version() > self.VERSION:
+                raise VaultError("La bóveda es de una versión más reciente de la aplicación")
+            enc_key = self.keys()[0]
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    entry["id"].encode()
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    damaged += 1
+                    self.garbage += 1
+                    continue
+                if entry.get("deleted") and not self._check_tombstone(enc_key, entry):
+                    damaged += 1
+                    self.garbage += 1
+                    continue
+                if entry["id"] in self.entries:
+                    self.garbage += 1
+                if entry.get("deleted"):
+                    self.entries.pop(entry["id"], None)
+                    self.garbage += 1
+                else:
+                    self.entries[entry["id"]] = line
+
+        records = []
+        for record_id, line in list(self.entries.items()):
+            try:
+                records.append(self._decode(enc_key, line))
+            except Exception:
+                del self.entries[record_id]
+                damaged += 1
+                self.garbage += 1
+        if damaged:
+            self.report = {"recovered": len(records), "damaged": damaged}
+        store = SessionStore.from_records(records)
+        if self._version() < self.VERSION:
+            self.upgrade(store)
+        return store
+
+    def upgrade(self, store):
+        """Pasa una bóveda antigua a subclaves separadas reescribiéndola entera"""
+        key = self.key()
+        self.header["version"] = self.VERSION
+        self.header["kdf"]["subkeys"] = "hkdf-sha256"
+        self.header["check"] = self._seal(self.subkeys(key)[0], self.CHECK, b"check")
+        self.compact(store)
+
+    def get(self, name):
+        """Descifra una única sesión por nombre"""
+        enc_key, id_key = self.keys()
+        line = self.entries.get(self.record_id(id_key, name))
+        return None if line is None else self._decode(enc_key, line)
+
+    def commit(self, store, changed=(), removed=()):
+        """Añade al log solo las sesiones modificadas o eliminadas"""
+        keys = self.keys()
+        lines = []
+        for record in changed:
+            record_id, line = self._encode(keys, record)
+            if record_id in self.entries:
+                self.garbage += 1
+            self.entries[record_id] = line
+            lines.append(line)
+        for record in removed:
+            record_id = self.record_id(keys[1], record.name)
+            if self.entries.pop(record_id, None) is not None:
+                self.garbage += 2
+                lines.append(self._tombstone(keys[0], record_id))
+
+        if self.garbage > max(self.COMPACT_MIN_GARBAGE, len(self.entries)):
+            self.compact(store)
+        elif lines:
+            # Una escritura cortada deja la última línea sin salto: no pegar la nueva a ella
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                separator = "" if f.read(1) == b"\n" else "\n"
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(separator + "\n".join(lines) + "\n")
+
+    def compact(self, store):
+        """Reescribe la bóveda con una línea por sesión vigente"""
+        keys = self.keys()
+        self.entries = dict(self._encode(keys, record) for record in store)
+        self.garbage = 0
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.header) + "\n")
+            for line in self.entries.values():
+                f.write(line + "\n")
+        os.replace(tmp_path, self.path)
+
+
+class SnapshotRing:
+    """Anillo acotado de versiones de archivos con almacenamiento deduplicado.
+
+    Cada versión es una entrada del manifiesto que apunta a un blob
+    direccionado por su SHA-256, así que contenidos idénticos se guardan una
+    sola vez. Cada archivo (`target`) tiene su propio límite de versiones y
+    de tamaño: al superarlo se descartan sus versiones más antiguas y los
+    blobs huérfanos, sin tocar las versiones de los demás archivos.
+    """
+
+    def __init__(self, directory, limits=None, max_count=50, max_bytes=32 * 1024 * 1024):
+        self.directory = directory
+        self.blobs_dir = os.path.join(directory, "blobs")
+        self.manifest_path = os.path.join(directory, "ring.json")
+        # target -> (máximo de versiones, máximo de bytes); el resto usa los valores por defecto
+        self.limits = dict(limits or {})
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.entries = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)["entries"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "entries": self.entries}, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest)
+
+    def _write_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def snapshot(self, target, path, label=""):
+        """Guarda la versión actual de `path` (o su ausencia) si difiere de la última"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+
+        digest = None if data is None else self._write_blob(data)
+        last = self.latest(target)
+        if last is not None and last["blob"] == digest and last["path"] == path:
+            return last
+
+        entry = {
+            "id": self.entries[-1]["id"] + 1 if self.entries else 1,
+            "time": time.time(),
+            "target": target,
+            "path": path,
+            "blob": digest,
+            "size": 0 if data is None else len(data),
+            "label": label,
+        }
+        self.entries.append(entry)
+        self._evict(target)
+        self._save_manifest()
+        return entry
+
+    def latest(self, target):
+        for entry in reversed(self.entries):
+            if entry["target"] == target:
+                return entry
+        return None
+
+    def history(self, target=None):
+        """Versiones guardadas, de la más reciente a la más antigua"""
+        return [entry for entry in reversed(self.entries) if target is None or entry["target"] == target]
+
+    def total_bytes(self, target=None):
+        """Tamaño en disco de los blobs referenciados (cada contenido cuenta una vez)"""
+        sizes = {entry["blob"]: entry["size"] for entry in self.entries
+                 if entry["blob"] and (target is None or entry["target"] == target)}
+        return sum(sizes.values())
+
+    def _evict(self, target):
+        """Aplica los límites del archivo indicado; la versión más reciente nunca se descarta"""
+        max_count, max_bytes = self.limits.get(target, (self.max_count, self.max_bytes))
+        entries = self.history(target)
+        evicted = False
+        while len(entries) > max_count or (len(entries) > 1 and self.total_bytes(target) > max_bytes):
+            self.entries.remove(entries.pop())
+            evicted = True
+        if evicted:
+            self._collect_garbage()
+
+    def purge(self, target):
+        """Elimina todas las versiones de un archivo y sus blobs"""
+        self.entries = [entry for entry in self.entries if entry["target"] != target]
+        self._collect_garbage()
+        self._save_manifest()
+
+    def _collect_garbage(self):
+        referenced = {entry["blob"] for entry in self.entries if entry["blob"]}
+        for digest in os.listdir(self.blobs_dir):
+            if digest not in referenced:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+
+    def restore(self, entry):
+        """Devuelve el archivo al contenido de la versión indicada"""
+        if entry["blob"] is None:
+            if os.path.exists(entry["path"]):
+                os.remove(entry["path"])
+            return
+        with open(self._blob_path(entry["blob"]), 'rb') as f:
+            data = f.read()
+        tmp_path = entry["path"] + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, entry["path"])
+
+    def rollback(self, target):
+        """Deshace el último cambio: restaura la versión más reciente y la saca del anillo"""
+        entry = self.latest(target)
+        if entry is None:
+            return None
+        self.restore(entry)
+        self.entries.remove(entry)
+        self._collect_garbage()
+        self._save_manifest()
+        return entry
+
+
+# Límites independientes para que un archivo de sesiones grande no expulse las versiones de startup.meta
+SNAPSHOT_LIMITS = {"startup": (50, 4 * 1024 * 1024), "store": (20, 32 * 1024 * 1024)}
+
+
+def default_data_dir():
+    """Carpeta de datos del programa (sesiones, plantillas y versiones)"""
+    return os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "RDR2SessionManager")
+
+
+class StartupWriter:
+    """Escribe y elimina startup.meta sin depender de la interfaz"""
+
+    FILENAME = "startup.meta"
+
+    def __init__(self, templates, snapshots=None, cache_size=18):
+        self.templates = templates
+        self.snapshots = snapshots
+        # Payloads precalculados; la clave incluye el mtime de la plantilla
+        self.payloads = PayloadCache(
+            lambda cache_key: templates.build(cache_key[0], cache_key[2]),
+            maxsize=cache_size
+        )
+
+    def path(self, game_path):
+        return os.path.join(game_path, self.FILENAME)
+
+    def payload(self, key, profile=DEFAULT_PROFILE):
+        template = self.templates.get(profile)
+        return self.payloads.get((template.name, template.mtime, key))
+
+    def activate(self, game_path, key, profile=DEFAULT_PROFILE, label=""):
+        """Escribe el payload de una sola vez, guardando antes la versión anterior"""
+        payload = self.payload(key, profile)
+        startup_path = self.path(game_path)
+        if self.snapshots is not None:
+            self.snapshots.snapshot("startup", startup_path, label)
+        with open(startup_path, 'wb') as f:
+            f.write(payload)
+
+    def deactivate(self, game_path, label=""):
+        """Elimina startup.meta (modo público); devuelve False si no existía"""
+        startup_path = self.path(game_path)
+        if not os.path.exists(startup_path):
+            return False
+        if self.snapshots is not None:
+            self.snapshots.snapshot("startup", startup_path, label)
+        os.remove(startup_path)
+        return True
+
+    def status(self, game_path):
+        """Devuelve (activo, perfil, clave) según el startup.meta actual"""
+        startup_path = self.path(game_path)
+        if not os.path.exists(startup_path):
+            return False, None, None
+        with open(startup_path, 'rb') as f:
+            content = f.read()
+        profile, key = self.templates.detect(content)
+        return True, profile, key
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+RDR2 Session Manager - Modo flota
+Aplica sesiones en muchos equipos de la red local a partir de un manifiesto.
+
+Cada equipo ejecuta un agente sin interfaz (`agent`) que escribe startup.meta
+con el mismo escritor que la aplicación. El agente solo lee las sesiones y
+plantillas de la aplicación; sus versiones de startup.meta van en una carpeta
+propia para no pisar los archivos que la aplicación tiene abiertos. El equipo
+de control (`push`) lee el manifiesto y envía las activaciones en paralelo.
+
+Protocolo: una petición por conexión TCP, mensajes JSON de una línea.
+  1. agente  -> {"hello": "rdr2-fleet", "version": 1, "nonce": "..."}
+  2. control -> {"request": {...}, "mac": HMAC-SHA256(secreto, "request", nonce, petición)}
+  3. agente  -> {"reply": {...}, "mac": HMAC-SHA256(secreto, "reply", nonce, respuesta)}
+El nonce es nuevo en cada conexión, así que una petición capturada no se puede repetir.
+"""
+
+import os
+import sys
+import json
+import time
+import hmac
+import asyncio
+import getpass
+import hashlib
+import shutil
+import socket
+import secrets
+import argparse
+import tempfile
+import subprocess
+
+# Solo el núcleo sin interfaz: el agente no necesita tkinter
+from rdr2_core import (
+    DEFAULT_PROFILE,
+    SNAPSHOT_LIMITS,
+    DerivedKeyCache,
+    JsonSessionBackend,
+    SessionStore,
+    SessionValidator,
+    SessionVault,
+    SnapshotRing,
+    StartupWriter,
+    TemplateLibrary,
+    default_data_dir,
+)
+
+PROTOCOL = "rdr2-fleet"
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 47123
+MESSAGE_LIMIT = 64 * 1024
+SECRET_MIN_LENGTH = 16
+ACTIONS = ("activate", "public", "status")
+ACTION_LABELS = {"activate": "activar", "public": "público", "status": "estado"}
+REQUEST_TEXT_FIELDS = ("install_path", "session", "key", "profile")
+
+
+class AgentError(Exception):
+    """El agente respondió con un error; reintentar no cambiaría el resultado"""
+    pass
+
+
+# --- Protocolo ---------------------------------------------------------------
+
+def default_secret_path():
+    return os.path.join(default_data_dir(), "fleet.key")
+
+
+def load_secret(path=None):
+    """Secreto compartido desde RDR2_FLEET_SECRET o desde el archivo de clave"""
+    secret = os.environ.get("RDR2_FLEET_SECRET")
+    if secret is None:
+        path = path or default_secret_path()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                secret = f.read()
+        except OSError as e:
+            raise ValueError(f"No se pudo leer el secreto de la flota ({path}): {e.strerror}")
+    secret = secret.strip()
+    if len(secret) < SECRET_MIN_LENGTH:
+        raise ValueError(f"El secreto de la flota debe tener al menos {SECRET_MIN_LENGTH} caracteres")
+    return secret.encode("utf-8")
+
+
+def sign(secret, direction, nonce, payload):
+    """HMAC del mensaje ligado a su dirección y al nonce de la conexión"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    message = f"{direction}\n{nonce}\n{canonical}".encode("utf-8")
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def verify(secret, direction, nonce, payload, mac):
+    return isinstance(mac, str) and hmac.compare_digest(sign(secret, direction, nonce, payload), mac)
+
+
+async def send_message(writer, message):
+    writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def read_message(reader):
+    """Lee un mensaje JSON de una línea; ValueError si está truncado o mal formado"""
+    line = await reader.readline()
+    if not line.endswith(b"\n"):
+        raise ValueError("Conexión cerrada antes de recibir el mensaje completo")
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("Mensaje con formato inesperado")
+    return message
+
+
+# --- Agente ------------------------------------------------------------------
+
+class FleetAgent:
+    """Agente sin interfaz: atiende peticiones autenticadas y escribe startup.meta"""
+
+    READ_TIMEOUT = 10
+
+    STATE_DIR = "fleet-agent"
+
+    def __init__(self, secret, data_dir=None, allowed_paths=None):
+        self.secret = secret
+        self.data_dir = data_dir or default_data_dir()
+        # Sesiones y plantillas de la aplicación: solo lectura (se reemplazan de forma atómica)
+        self.sessions_file = os.path.join(self.data_dir, "rdr2_sessions.json")
+        self.vault_file = os.path.join(self.data_dir, "rdr2_sessions.vault")
+        self.templates = TemplateLibrary(os.path.join(self.data_dir, "templates"))
+        # Versiones propias: la aplicación reescribe su ring.json desde memoria y borraría las del agente
+        self.state_dir = os.path.join(self.data_dir, self.STATE_DIR)
+        os.makedirs(self.state_dir, exist_ok=True)
+        snapshots = SnapshotRing(os.path.join(self.state_dir, "snapshots"),
+                                 limits=SNAPSHOT_LIMITS)
+        self.writer = StartupWriter(self.templates, snapshots)
+        self.allowed_paths = None
+        if allowed_paths:
+            self.allowed_paths = {os.path.normcase(os.path.abspath(path)) for path in allowed_paths}
+        self.lock = None
+
+    def open_store(self):
+        """Almacén de la aplicación para resolver nombres (None si está cifrado).
+
+        Se relee en cada petición y nunca se escribe: la aplicación lo guarda
+        entero desde memoria y perdería cualquier cambio hecho por el agente.
+        """
+        if os.path.exists(self.vault_file):
+            # Sin nadie que escriba la contraseña la bóveda no se puede abrir
+            return None
+        return JsonSessionBackend(self.sessions_file).load()
+
+    def check_path(self, install_path):
+        if not isinstance(install_path, str) or not install_path:
+            raise ValueError("Falta la ruta de instalación")
+        normalized = os.path.normcase(os.path.abspath(install_path))
+        if self.allowed_paths is not None and normalized not in self.allowed_paths:
+            raise ValueError(f"Ruta no permitida en este equipo: {install_path}")
+        if not os.path.isdir(install_path):
+            raise ValueError(f"La ruta no existe: {install_path}")
+
+    def execute(self, request):
+        """Ejecuta una petición ya autenticada y devuelve el resultado"""
+        action = request.get("action")
+        if not isinstance(action, str) or action not in ACTIONS:
+            raise ValueError(f"Acción desconocida: {action!r}")
+        for field in REQUEST_TEXT_FIELDS:
+            if request.get(field) is not None and not isinstance(request[field], str):
+                raise ValueError(f"El campo '{field}' debe ser texto")
+        install_path = request.get("install_path")
+        self.check_path(install_path)
+
+        if action == "public":
+            removed = self.writer.deactivate(install_path, label="Modo público (flota)")
+            return {"removed": removed}
+
+        store = self.open_store()
+        if action == "status":
+            active, profile, key = self.writer.status(install_path)
+            matches = store.with_key(key) if store is not None and key is not None else []
+            return {"active": active, "profile": profile, "key": key,
+                    "session": matches[0].name if matches else None}
+
+        name = request.get("session")
+        key = request.get("key")
+        profile = request.get("profile")
+        record = None
+        if store is not None:
+            if key is None and name is not None:
+                record = store.get(name)
+            elif key is not None:
+                matches = store.with_key(key)
+                record = matches[0] if matches else None
+        if key is None:
+            if record is None:
+                raise ValueError(f"Sesión desconocida en este equipo: {name!r}")
+            key = record.key
+        if profile is None:
+            profile = record.profile if record is not None else DEFAULT_PROFILE
+        # Solo perfiles de la carpeta de plantillas: nunca una ruta enviada por la red
+        if profile not in self.templates.names():
+            raise ValueError(f"Plantilla desconocida en este equipo: {profile!r}")
+        SessionValidator.check_key(key)
+
+        self.writer.activate(install_path, key, profile,
+                             label=f"Antes de activar '{name or key}' (flota)")
+        return {"session": record.name if record is not None else name, "profile": profile}
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        peer = peer[0] if peer else "?"
+        nonce = secrets.token_hex(16)
+        try:
+            await send_message(writer, {"hello": PROTOCOL, "version": PROTOCOL_VERSION, "nonce": nonce})
+            message = await asyncio.wait_for(read_message(reader), self.READ_TIMEOUT)
+            request = message.get("request")
+            if not isinstance(request, dict) or not verify(self.secret, "request", nonce, request,
+                                                            message.get("mac")):
+                print(f"🚫 {peer}: petición rechazada (autenticación fallida)")
+                reply = {"ok": False, "error": "Autenticación fallida"}
+            else:
+                try:
+                    # Una escritura a la vez aunque lleguen varias rutas del mismo equipo
+                    async with self.lock:
+                        result = self.execute(request)
+                    reply = {"ok": True, "result": result}
+                    print(f"✅ {peer}: {ACTION_LABELS[request['action']]} {request.get('install_path')}")
+                except (ValueError, OSError, KeyError, TypeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                    print(f"❌ {peer}: {e}")
+            await send_message(writer, {"reply": reply, "mac": sign(self.secret, "reply", nonce, reply)})
+        except (asyncio.TimeoutError, ValueError, OSError) as e:
+            print(f"⚠️ {peer}: conexión descartada ({str(e) or type(e).__name__})")
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        # El candado se crea dentro del bucle de eventos que lo va a usar
+        self.lock = asyncio.Lock()
+        server = await asyncio.start_server(self.handle, host, port, limit=MESSAGE_LIMIT)
+        addresses = ", ".join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"🛰️ Agente de flota escuchando en {addresses}")
+        print(f"📂 Sesiones y plantillas: {self.data_dir}")
+        print(f"🕘 Versiones del agente: {self.state_dir}")
+        async with server:
+            await server.serve_forever()
+
+
+# --- Equipo de control -------------------------------------------------------
+
+class FleetJob:
+    """Una ruta de instalación de un equipo del manifiesto y su resultado"""
+
+    def __init__(self, host, port, install_path, request):
+        self.host = host
+        self.port = port
+        self.install_path = install_path
+        self.request = request
+        self.ok = False
+        self.error = None
+        self.detail = "pendiente"
+        self.attempts = 0
+        self.elapsed = 0.0
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+
+def parse_address(address, default_port):
+    """'equipo', 'equipo:puerto' o '[::1]:puerto'"""
+    if address.startswith("["):
+        host, _, rest = address[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif address.count(":") == 1:
+        host, _, port = address.partition(":")
+    else:
+        host, port = address, ""
+    if not host:
+        raise ValueError(f"Equipo sin nombre en el manifiesto: {address!r}")
+    try:
+        return host, int(port) if port else default_port
+    except ValueError:
+        raise ValueError(f"Puerto no válido en el manifiesto: {address!r}")
+
+
+def load_manifest(path, store, action=None):
+    """Lee el manifiesto equipo -> ruta de instalación -> sesión y crea los trabajos.
+
+    La sesión puede ser un nombre del almacén local, null (modo público) o un
+    objeto con "session", "key", "profile" y "action".
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("hosts"), dict):
+        raise ValueError("El manifiesto debe tener un objeto \"hosts\"")
+    default_port = int(manifest.get("port", DEFAULT_PORT))
+
+    jobs = []
+    for address, paths in manifest["hosts"].items():
+        host, port = parse_address(address, default_port)
+        if not isinstance(paths, dict) or not paths:
+            raise ValueError(f"El equipo {address} no tiene rutas de instalación")
+        for install_path, target in paths.items():
+            if target is None:
+                target = {"action": "public"}
+            elif isinstance(target, str):
+                target = {"session": target}
+            elif not isinstance(target, dict):
+                raise ValueError(f"Sesión no válida para {address} {install_path}")
+            request = {"action": action or target.get("action", "activate"), "install_path": install_path}
+            if request["action"] not in ACTIONS:
+                raise ValueError(f"Acción desconocida para {address} {install_path}: {request['action']!r}")
+            job = FleetJob(host, port, install_path, request)
+            if request["action"] == "activate":
+                try:
+                    request.update(resolve_session(target, store, f"{address} {install_path}"))
+                except ValueError as e:
+                    # Una entrada errónea no detiene al resto de la flota
+                    job.error = str(e)
+            jobs.append(job)
+    return jobs
+
+
+def resolve_session(target, store, where):
+    """Completa clave y perfil desde el almacén local; si no está, el agente resuelve el nombre"""
+    name = target.get("session")
+    key = target.get("key")
+    profile = target.get("profile")
+    if name is None and key is None:
+        raise ValueError(f"Falta la sesión o la clave para {where}")
+    record = store.get(name) if name is not None and store is not None else None
+    if key is None and record is not None:
+        key = record.key
+    if profile is None and record is not None:
+        profile = record.profile
+    if key is not None:
+        SessionValidator.check_key(key)
+    fields = {"session": name, "key": key, "profile": profile}
+    return {field: value for field, value in fields.items() if value is not None}
+
+
+def open_local_store(sessions_file=None):
+    """Almacén del equipo de control; la bóveda pide la contraseña por consola"""
+    data_dir = os.path.dirname(sessions_file) if sessions_file else default_data_dir()
+    sessions_file = sessions_file or os.path.join(data_dir, "rdr2_sessions.json")
+    vault_file = os.path.join(data_dir, "rdr2_sessions.vault")
+    if os.path.exists(vault_file):
+        vault = SessionVault(vault_file, DerivedKeyCache(),
+                             lambda: getpass.getpass("🔐 Contraseña de la bóveda: "))
+        return vault.load()
+    if os.path.exists(sessions_file):
+        return JsonSessionBackend(sessions_file).load()
+    return SessionStore()
+
+
+async def call_agent(job, secret, timeout):
+    """Envía la petición de un trabajo a su agente y devuelve el resultado"""
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(job.host, job.port, limit=MESSAGE_LIMIT), timeout)
+    try:
+        hello = await asyncio.wait_for(read_message(reader), timeout)
+        nonce = hello.get("nonce")
+        if hello.get("hello") != PROTOCOL or hello.get("version") != PROTOCOL_VERSION or not nonce:
+            raise AgentError("El equipo no habla el protocolo de la flota")
+        await send_message(writer, {"request": job.request, "mac": sign(secret, "request", nonce, job.request)})
+        message = await asyncio.wait_for(read_message(reader), timeout)
+        reply = message.get("reply")
+        if not isinstance(reply, dict) or not verify(secret, "reply", nonce, reply, message.get("mac")):
+            raise AgentError("Respuesta sin firma válida (¿secreto distinto?)")
+        if not reply.get("ok"):
+            raise AgentError(reply.get("error") or "Error desconocido")
+        return reply.get("result") or {}
+    finally:
+        writer.close()
+
+
+def describe_result(action, result):
+    if action == "public":
+        return "🌐 modo público" if result.get("removed") else "🌐 ya estaba en modo público"
+    if action == "status" and not result.get("active"):
+        return "🌐 modo público"
+    session = result.get("session") or ("clave directa" if action == "activate" else "desconocida")
+    profile = result.get("profile")
+    return f"🔒 {session} (🧩 {profile})" if profile else f"🔒 {session}"
+
+
+async def run_jobs(jobs, secret, concurrency=16, retries=2, timeout=5.0, backoff=0.5):
+    """Lanza todos los trabajos a la vez, con un máximo de `concurrency` conexiones abiertas.
+
+    Los fallos de red se reintentan con espera exponencial; los errores que
+    devuelve el agente (clave no válida, ruta no permitida...) no.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        if job.error is not None:
+            job.detail = f"❌ {job.error}"
+            return
+        start = time.perf_counter()
+        for attempt in range(retries + 1):
+            job.attempts = attempt + 1
+            try:
+                # El semáforo se suelta durante la espera para no bloquear a otros equipos
+                async with semaphore:
+                    result = await call_agent(job, secret, timeout)
+                job.ok = True
+                job.detail = describe_result(job.request["action"], result)
+                break
+            except AgentError as e:
+                job.detail = f"❌ {e}"
+                break
+            except (OSError, asyncio.TimeoutError, ValueError) as e:
+                job.detail = f"📡 {str(e) or 'tiempo de espera agotado'}"
+                if attempt < retries:
+                    await asyncio.sleep(backoff * 2 ** attempt)
+        job.elapsed = time.perf_counter() - start
+
+    await asyncio.gather(*(run(job) for job in jobs))
+    return jobs
+
+
+def print_results(jobs):
+    """Tabla de resultados por equipo y ruta"""
+    headers = ["Equipo", "Ruta", "Acción", "Intentos", "Tiempo", "Resultado"]
+    rows = [[job.address, job.install_path, ACTION_LABELS[job.request["action"]],
+             str(job.attempts), f"{job.elapsed:.2f} s", job.detail]
+            for job in sorted(jobs, key=lambda job: (job.host, job.port, job.install_path))]
+    widths = [max(len(row[i]) for row in rows + [headers]) for i in range(len(headers) - 1)]
+    line = lambda row: "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) + "  " + row[-1]
+    print(line(headers))
+    print("-" * (sum(widths) + 2 * len(widths) + len(headers[-1])))
+    for row in rows:
+        print(line(row))
+    failed = sum(1 for job in jobs if not job.ok)
+    hosts = len({job.address for job in jobs})
+    print()
+    print(f"📊 {len(jobs) - failed}/{len(jobs)} rutas correctas en {hosts} equipos")
+    return failed
+
+
+def command_push(args, action=None):
+    try:
+        secret = load_secret(args.secret_file)
+        store = open_local_store(args.sessions_file)
+        jobs = load_manifest(args.manifest, store, action=action)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    if not jobs:
+        print("⚠️ El manifiesto no tiene rutas")
+        return 0
+    print(f"🚀 {len(jobs)} rutas en {len({job.address for job in jobs})} equipos "
+          f"(máx. {args.concurrency} a la vez, {args.retries} reintentos)")
+    print()
+    asyncio.run(run_jobs(jobs, secret, concurrency=args.concurrency,
+                         retries=args.retries, timeout=args.timeout))
+    return 1 if print_results(jobs) else 0
+
+
+def command_agent(args):
+    try:
+        secret = load_secret(args.secret_file)
+        agent = FleetAgent(secret, data_dir=args.data_dir, allowed_paths=args.allow_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    try:
+        asyncio.run(agent.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 Agente detenido")
+    except OSError as e:
+        print(f"❌ No se pudo iniciar el agente: {e}")
+        return 1
+    return 0
+
+
+def command_keygen(args):
+    path = args.secret_file or default_secret_path()
+    if os.path.exists(path) and not args.force:
+        print(f"⚠️ Ya existe {path} (usa --force para reemplazarlo)")
+        return 1
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(secrets.token_hex(32) + "\n")
+    if os.name != "nt":
+        os.chmod(path, 0o600)
+    print(f"🔑 Secreto de la flota guardado en {path}")
+    print("📋 Copia este archivo a cada equipo de la flota")
+    return 0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout):
+    """Espera a que un agente local acepte conexiones"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def command_loopback(args):
+    """Prueba de extremo a extremo: varios agentes en 127.0.0.1 con datos temporales.
+
+    Cada agente recibe una clave distinta; además se incluye un puerto sin
+    agente para ejercitar los reintentos. Devuelve 0 solo si cada equipo
+    quedó con su clave y el equipo apagado falló tras agotar los reintentos.
+    """
+    workdir = tempfile.mkdtemp(prefix="rdr2_fleet_")
+    secret = secrets.token_hex(32)
+    env = dict(os.environ, RDR2_FLEET_SECRET=secret)
+    agents = []
+    expected = {}
+    try:
+        hosts = {}
+        for index in range(1, args.agents + 1):
+            port = free_port()
+            data_dir = os.path.join(workdir, f"pc{index}", "datos")
+            game_dir = os.path.join(workdir, f"pc{index}", "x64", "data")
+            os.makedirs(game_dir)
+            agents.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "agent", "--host", "127.0.0.1",
+                 "--port", str(port), "--data-dir", data_dir, "--allow-path", game_dir],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            hosts[f"127.0.0.1:{port}"] = {game_dir: {"key": f"loopback-{index}"}}
+            expected[game_dir] = (port, f"loopback-{index}")
+        offline = f"127.0.0.1:{free_port()}"
+        hosts[offline] = {os.path.join(workdir, "apagado"): {"key": "loopback-apagado"}}
+
+        manifest_path = os.path.join(workdir, "flota.json")
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"hosts": hosts}, f, indent=1)
+
+        print(f"🛰️ Iniciando {args.agents} agentes en 127.0.0.1...")
+        for port, _ in expected.values():
+            if not wait_for_port(port, timeout=15):
+                print(f"❌ El agente del puerto {port} no arrancó")
+                return 1
+
+        jobs = load_manifest(manifest_path, SessionStore())
+        asyncio.run(run_jobs(jobs, secret.encode("utf-8"), concurrency=args.concurrency,
+                             retries=1, timeout=2.0, backoff=0.1))
+        print_results(jobs)
+
+        errors = []
+        writer = StartupWriter(TemplateLibrary(os.path.join(workdir, "sin-plantillas")))
+        for game_dir, (port, key) in expected.items():
+            active, _, found = writer.status(game_dir)
+            if not active or found != key:
+                errors.append(f"127.0.0.1:{port} tiene {found!r} en vez de {key!r}")
+        for job in jobs:
+            if job.address == offline and (job.ok or job.attempts != 2):
+                errors.append(f"{offline} debería fallar tras 2 intentos ({job.attempts}, {job.detail})")
+        print()
+        for error in errors:
+            print(f"❌ {error}")
+        if errors:
+            return 1
+        print(f"✅ Prueba en loopback correcta: {args.agents} agentes")
+        return 0
+    finally:
+        for agent in agents:
+            agent.terminate()
+            agent.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modo flota de RDR2 Session Manager")
+    parser.add_argument("--secret-file", help="Archivo con el secreto compartido "
+                                              "(por defecto fleet.key en la carpeta de datos)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    keygen_parser = subparsers.add_parser("keygen", help="Genera el secreto compartido de la flota")
+    keygen_parser.add_argument("--force", action="store_true", help="Reemplaza el secreto existente")
+
+    agent_parser = subparsers.add_parser("agent", help="Agente sin interfaz para cada equipo")
+    agent_parser.add_argument("--host", default="0.0.0.0", help="Dirección de escucha")
+    agent_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Puerto de escucha")
+    agent_parser.add_argument("--data-dir", help="Carpeta de datos de la aplicación (sesiones y plantillas); "
+                                                 "las versiones del agente van en su subcarpeta fleet-agent")
+    agent_parser.add_argument("--allow-path", action="append",
+                              help="Ruta de instalación permitida (se puede repetir)")
+
+    for name, help_text in (("push", "Aplica el manifiesto en todos los equipos"),
+                            ("status", "Consulta el estado de todas las rutas del manifiesto")):
+        push_parser = subparsers.add_parser(name, help=help_text)
+        push_parser.add_argument("manifest", help="Manifiesto JSON equipo -> ruta -> sesión")
+        push_parser.add_argument("--sessions-file", help="Archivo de sesiones local para resolver nombres")
+        push_parser.add_argument("--concurrency", type=int, default=16, help="Conexiones simultáneas")
+        push_parser.add_argument("--retries", type=int, default=2, help="Reintentos ante fallos de red")
+        push_parser.add_argument("--timeout", type=float, default=5.0, help="Segundos por intento")
+
+    loopback_parser = subparsers.add_parser("loopback", help="Prueba con varios agentes locales en 127.0.0.1")
+    loopback_parser.add_argument("--agents", type=int, default=3, help="Número de agentes")
+    loopback_parser.add_argument("--concurrency", type=int, default=16, help="Conexiones simultáneas")
+
+    args = parser.parse_args()
+
+    if args.command == "keygen":
+        return command_keygen(args)
+    if args.command == "agent":
+        return command_agent(args)
+    if args.command == "loopback":
+        return command_loopback(args)
+    return command_push(args, action="status" if args.command == "status" else None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import os
 import json
 import shutil
@@ -9,9 +9,137 @@ try:
 except ImportError:
     winreg = None  # Para compatibilidad con otros OS
 from pathlib import Path
-import subprocess
+import time
+from collections import OrderedDict, deque
+
+from rdr2_core import (
+    AESGCM,
+    DEFAULT_PROFILE,
+    SNAPSHOT_LIMITS,
+    DerivedKeyCache,
+    JsonSessionBackend,
+    SessionStore,
+    SessionValidator,
+    SessionVault,
+    SnapshotRing,
+    StartupWriter,
+    TemplateLibrary,
+    VaultError,
+    default_data_dir,
+    read_import_entries,
+)
+
+
+class Notifier:
+    """Cola de notificaciones no modales que agrupa ráfagas de eventos.
+
+    Los eventos que llegan dentro de la misma ventana de tiempo se muestran
+    juntos en un único aviso. En modo silencioso solo se registran en el
+    historial, sin mostrar nada, para que las operaciones en lote no esperen
+    a la interfaz. Lo que no cabe en el historial se añade a `log_path`
+    en bloques, para no perder eventos (p. ej. miles de rechazos al importar).
+    """
+
+    def __init__(self, root, render, window_ms=300, history_size=1000, log_path=None):
+        self.root = root
+        self.render = render                  # render(level, text)
+        self.window_ms = window_ms
+        self.history = deque(maxlen=history_size)
+        self.log_path = log_path
+        self.overflow = []                    # eventos expulsados del historial pendientes de escribir
+        self.logged = 0                       # eventos escritos en log_path en esta sesión
+        self.pending = []
+        self.quiet = False
+        self.suppressed = 0
+        self._flush_id = None
+
+    def notify(self, message, burst=None, level='info'):
+        """Encola un aviso; `burst` es el resumen ("{n} sesiones activadas") si llegan varios iguales"""
+        self.record(message, level)
+        if self.quiet:
+            self.suppressed += 1
+            return
+        self.pending.append((level, burst, message))
+        if self._flush_id is None:
+            self._flush_id = self.root.after(self.window_ms, self.flush)
+
+    def record(self, message, level='info'):
+        """Registra un evento en el historial sin mostrarlo"""
+        if len(self.history) == self.history.maxlen:
+            self.overflow.append(self.history[0])
+            if len(self.overflow) >= self.history.maxlen:
+                self.write_log()
+        self.history.append((time.time(), level, message))
+
+    def write_log(self):
+        """Añade al registro los eventos que ya no caben en el historial"""
+        if not self.overflow:
+            return
+        entries, self.overflow = self.overflow, []
+        if self.log_path is None:
+            return
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for when, level, message in entries:
+                    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(when))
+                    f.write(f"{stamp} [{level}] {message}\n")
+            self.logged += len(entries)
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el registro de notificaciones: {e}")
+
+    def error(self, message, burst=None):
+        self.notify(message, burst, level='error')
+
+    def flush(self):
+        """Muestra los avisos pendientes, agrupando los que comparten resumen"""
+        self._flush_id = None
+        self.write_log()
+        if not self.pending:
+            return
+        groups = OrderedDict()
+        for level, burst, message in self.pending:
+            # Sin resumen se agrupan los mensajes idénticos
+            entry = groups.setdefault(burst or message, [level, burst, []])
+            if level == 'error':
+                entry[0] = 'error'
+            entry[2].append(message)
+        self.pending = []
+
+        lines = []
+        worst = 'info'
+        for level, burst, messages in groups.values():
+            if len(messages) == 1:
+                lines.append(messages[0])
+            elif burst is not None:
+                lines.append(burst.format(n=len(messages)))
+            else:
+                # El mensaje puede traer llaves (nombres de sesión): no usarlo como formato
+                lines.append(f"{messages[0]} (×{len(messages)})")
+            if level == 'error':
+                worst = 'error'
+        self.render(worst, "\n".join(lines))
+
+    def set_quiet(self, quiet):
+        """Activa o desactiva el modo silencioso; al salir se resume lo registrado"""
+        self.quiet = quiet
+        if not quiet and self.suppressed:
+            count, self.suppressed = self.suppressed, 0
+            self.notify(f"🔕 {count} eventos registrados en modo silencioso")
+
+
+
 
 class RDR2SessionManager:
+    VIEW_ALL = "📋 Todas las sesiones"
+    VIEW_RECENT = "🕒 Más recientes"
+    RECENT_LIMIT = 20
+    TREE_PAGE_SIZE = 200
+    QUICK_SWITCH_SIZE = 9
+    VAULT_KEY_TIMEOUT = 15 * 60
+    TOAST_MS = 2500
+    # Los contadores de uso se guardan agrupados, no en cada cambio de sesión
+    USAGE_SAVE_MS = 10000
+
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("🎮 RDR2 Session Manager")
@@ -30,65 +158,43 @@ class RDR2SessionManager:
 
         # Variables
         self.game_path = tk.StringVar()
+        self.view_var = tk.StringVar(value=self.VIEW_ALL)
+        self.view_options = {}
         # Guardar configuración en el mismo directorio del ejecutable
         # Guardar configuración en una carpeta oculta del usuario (AppData/Roaming)
-        self.sessions_file = os.path.join(
-            os.environ.get("APPDATA", os.path.expanduser("~")),
-            "RDR2SessionManager",
-            "rdr2_sessions.json"
-        )
+        self.sessions_file = os.path.join(default_data_dir(), "rdr2_sessions.json")
+        # Bóveda cifrada opcional junto al archivo de sesiones
+        self.vault_file = os.path.join(os.path.dirname(self.sessions_file), "rdr2_sessions.vault")
+        self.key_cache = DerivedKeyCache(timeout=self.VAULT_KEY_TIMEOUT)
         # Crear la carpeta si no existe
         os.makedirs(os.path.dirname(self.sessions_file), exist_ok=True)
-        self.startup_template = """<?xml version="1.0" encoding="UTF-8"?>
-<CDataFileMgr__ContentsOfDataFileXml>
- <disabledFiles />
- <includedXmlFiles itemType="CDataFileMgr__DataFileArray" />
- <includedDataFiles />
- <dataFiles itemType="CDataFileMgr__DataFile">
-  <Item>
-   <filename>platform:/data/cdimages/scaleform_platform_pc.rpf</filename>
-   <fileType>RPF_FILE</fileType>
-  </Item>
-  <Item>
-   <filename>platform:/data/ui/value_conversion.rpf</filename>
-   <fileType>RPF_FILE</fileType>
-  </Item>
-  <Item>
-   <filename>platform:/data/ui/widgets.rpf</filename>
-   <fileType>RPF_FILE</fileType>
-  </Item>
-  <Item>
-   <filename>platform:/textures/ui/ui_photo_stickers.rpf</filename>
-   <fileType>RPF_FILE</fileType>
-  </Item>
-  <Item>
-   <filename>platform:/textures/ui/ui_platform.rpf</filename>
-   <fileType>RPF_FILE</fileType>
-  </Item>
-  <Item>
-   <filename>platform:/data/ui/stylesCatalog</filename>
-   <fileType>aWeaponizeDisputants</fileType> <!-- collision -->
-  </Item>
-  <Item>
-   <filename>platform:/data/cdimages/scaleform_frontend.rpf</filename>
-   <fileType>RPF_FILE_PRE_INSTALL</fileType>
-  </Item>
-  <Item>
-   <filename>platform:/textures/ui/ui_startup_textures.rpf</filename>
-   <fileType>RPF_FILE</fileType>
-  </Item>
-  <Item>
-   <filename>platform:/data/ui/startup_data.rpf</filename>
-   <fileType>RPF_FILE</fileType>
-  </Item>
- </dataFiles>
- <contentChangeSets itemType="CDataFileMgr__ContentChangeSet" />
- <patchFiles />
-</CDataFileMgr__ContentsOfDataFileXml>{session_key}"""
+
+        # Versiones anteriores de startup.meta y del archivo de sesiones
+        self.snapshots = SnapshotRing(os.path.join(os.path.dirname(self.sessions_file), "snapshots"),
+                                      limits=SNAPSHOT_LIMITS)
+        if os.path.exists(self.vault_file):
+            # Las versiones del JSON anteriores a la bóveda contienen las claves en texto plano
+            self.snapshots.purge("store")
+
+        # Perfiles de plantilla de startup.meta (archivos *.meta junto a las sesiones)
+        self.templates = TemplateLibrary(os.path.join(os.path.dirname(self.sessions_file), "templates"))
+        os.makedirs(self.templates.directory, exist_ok=True)
 
         # Discord link desde variable de entorno o valor por defecto
         self.discord_url = os.environ.get("DISCORD_URL", "https://discord.gg/8HTjHDJ86x")
 
+        # Escritura de startup.meta con payloads precalculados para el cambio rápido
+        self.writer = StartupWriter(self.templates, self.snapshots, cache_size=self.QUICK_SWITCH_SIZE * 2)
+
+        # Notificaciones no modales para las acciones frecuentes
+        self.notifier = Notifier(self.root, self.show_toast,
+                                 log_path=os.path.join(os.path.dirname(self.sessions_file), "notifications.log"))
+        self.toast = None
+        self.toast_hide_id = None
+        # Registros con uso pendiente de guardar y temporizador del guardado agrupado
+        self.pending_usage = {}
+        self.usage_save_id = None
+
         # Inicializar
         self.load_sessions()
         self.detect_game_path()
@@ -270,7 +376,38 @@ class RDR2SessionManager:
             except:
                 return None
             
+    def create_menu(self):
+        """Crea la barra de menú con el cambio rápido de sesiones recientes"""
+        menubar = tk.Menu(self.root)
+        self.quick_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="⚡ Cambio rápido", menu=self.quick_menu)
+
+        self.profile_menu = tk.Menu(menubar, tearoff=0, postcommand=self.refresh_profile_menu)
+        menubar.add_cascade(label="🧩 Plantillas", menu=self.profile_menu)
+
+        vault_menu = tk.Menu(menubar, tearoff=0)
+        vault_menu.add_command(label="🔐 Cifrar sesiones...", command=self.enable_vault)
+        vault_menu.add_command(label="🔒 Bloquear ahora", command=self.lock_vault)
+        menubar.add_cascade(label="🔐 Bóveda", menu=vault_menu)
+
+        history_menu = tk.Menu(menubar, tearoff=0)
+        history_menu.add_command(label="↩️ Deshacer cambio de startup.meta", command=self.undo_startup_change)
+        history_menu.add_command(label="🕘 Versiones guardadas...", command=self.show_snapshots)
+        menubar.add_cascade(label="🕘 Versiones", menu=history_menu)
+        self.root.config(menu=menubar)
+
+    def refresh_profile_menu(self):
+        """Lista los perfiles para aplicarlos a la sesión seleccionada"""
+        self.profile_menu.delete(0, tk.END)
+        for name in self.templates.names():
+            self.profile_menu.add_command(label=f"🧩 Usar '{name}' en la sesión seleccionada",
+                                          command=lambda profile=name: self.set_session_profile(profile))
+        self.profile_menu.add_separator()
+        self.profile_menu.add_command(label="📂 Abrir carpeta de plantillas", command=self.open_templates_folder)
+
     def create_ui(self):
+        self.create_menu()
+
         # Frame principal con padding optimizado
         main_frame = ttk.Frame(self.root, padding="10 10 10 10", style='TFrame')
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -330,6 +467,9 @@ class RDR2SessionManager:
         
         ttk.Label(input_grid, text="Nombre de la sesión:", font=('Segoe UI', 9, 'bold')).grid(row=0, column=0, sticky=tk.W, padx=(0, 15))
         ttk.Label(input_grid, text="Clave de sesión:", font=('Segoe UI', 9, 'bold')).grid(row=0, column=1, sticky=tk.W)
+        ttk.Label(input_grid, text="Grupo:", font=('Segoe UI', 9, 'bold')).grid(row=2, column=0, sticky=tk.W, padx=(0, 15), pady=(6, 0))
+        ttk.Label(input_grid, text="Etiquetas (separadas por comas):", font=('Segoe UI', 9, 'bold')).grid(row=2, column=1, sticky=tk.W, pady=(6, 0))
+        ttk.Label(input_grid, text="Plantilla:", font=('Segoe UI', 9, 'bold')).grid(row=2, column=2, sticky=tk.W, padx=(15, 0), pady=(6, 0))
         
         self.session_name_var = tk.StringVar()
         name_entry = ttk.Entry(input_grid, textvariable=self.session_name_var, width=25, 
@@ -340,6 +480,22 @@ class RDR2SessionManager:
         key_entry = ttk.Entry(input_grid, textvariable=self.session_key_var, width=35, 
                              style='Modern.TEntry')
         key_entry.grid(row=1, column=1, pady=(5, 0), sticky=(tk.W, tk.E))
+
+        self.session_group_var = tk.StringVar()
+        group_entry = ttk.Entry(input_grid, textvariable=self.session_group_var, width=25,
+                                style='Modern.TEntry')
+        group_entry.grid(row=3, column=0, padx=(0, 15), pady=(5, 0), sticky=(tk.W, tk.E))
+
+        self.session_tags_var = tk.StringVar()
+        tags_entry = ttk.Entry(input_grid, textvariable=self.session_tags_var, width=35,
+                               style='Modern.TEntry')
+        tags_entry.grid(row=3, column=1, pady=(5, 0), sticky=(tk.W, tk.E))
+
+        self.session_profile_var = tk.StringVar(value=DEFAULT_PROFILE)
+        self.profile_combo = ttk.Combobox(input_grid, textvariable=self.session_profile_var,
+                                          state='readonly', width=15,
+                                          postcommand=lambda: self.profile_combo.configure(values=self.templates.names()))
+        self.profile_combo.grid(row=3, column=2, padx=(15, 0), pady=(5, 0), sticky=(tk.W, tk.E))
         
         input_grid.columnconfigure(0, weight=1)
         input_grid.columnconfigure(1, weight=1)
@@ -362,23 +518,42 @@ class RDR2SessionManager:
         table_container = ttk.Frame(manage_frame, style='TFrame')
         table_container.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 2), pady=(0, 0))
 
+        # Selector de vista: todas, recientes, por grupo o por etiqueta
+        view_frame = ttk.Frame(table_container, style='TFrame')
+        view_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 6))
+        ttk.Label(view_frame, text="Vista:", font=('Segoe UI', 9, 'bold')).pack(side=tk.LEFT, padx=(0, 8))
+        self.view_combo = ttk.Combobox(view_frame, textvariable=self.view_var, state='readonly', width=30)
+        self.view_combo.pack(side=tk.LEFT)
+        self.view_combo.bind('<<ComboboxSelected>>', lambda e: self.refresh_sessions_list())
+
         # Treeview mejorado
-        self.sessions_tree = ttk.Treeview(table_container, columns=('name', 'key'), 
+        self.sessions_tree = ttk.Treeview(table_container, columns=('name', 'key', 'group', 'tags', 'profile', 'uses'), 
                                          show='headings', height=8, style='Modern.Treeview')
         self.sessions_tree.heading('name', text='🎮 Nombre de Sesión')
         self.sessions_tree.heading('key', text='🔑 Clave')
-        self.sessions_tree.column('name', width=220, anchor='w')
-        self.sessions_tree.column('key', width=350, anchor='w')
-        self.sessions_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.sessions_tree.heading('group', text='📁 Grupo')
+        self.sessions_tree.heading('tags', text='🏷️ Etiquetas')
+        self.sessions_tree.heading('profile', text='🧩 Plantilla')
+        self.sessions_tree.heading('uses', text='🕒 Usos')
+        self.sessions_tree.column('name', width=180, anchor='w')
+        self.sessions_tree.column('key', width=200, anchor='w')
+        self.sessions_tree.column('group', width=100, anchor='w')
+        self.sessions_tree.column('tags', width=120, anchor='w')
+        self.sessions_tree.column('profile', width=80, anchor='w')
+        self.sessions_tree.column('uses', width=50, anchor='center')
+        self.sessions_tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
-        # Scrollbar mejorada
-        scrollbar = ttk.Scrollbar(table_container, orient='vertical', 
-                                 command=self.sessions_tree.yview, style='Modern.Vertical.TScrollbar')
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        self.sessions_tree.configure(yscrollcommand=scrollbar.set)
+        # Scrollbar mejorada (al acercarse al final se dibuja la siguiente página)
+        self.tree_scrollbar = ttk.Scrollbar(table_container, orient='vertical',
+                                            command=self.sessions_tree.yview, style='Modern.Vertical.TScrollbar')
+        self.tree_scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.sessions_tree.configure(yscrollcommand=self.on_tree_scroll)
+        self.view_records = []
+        self.rendered_rows = 0
+        self.render_pending = False
 
         table_container.columnconfigure(0, weight=1)
-        table_container.rowconfigure(0, weight=1)
+        table_container.rowconfigure(1, weight=1)
 
         # Botones de acción verticales a la derecha
         button_frame = ttk.Frame(manage_frame, style='TFrame')
@@ -394,7 +569,23 @@ class RDR2SessionManager:
 
         public_btn = ttk.Button(button_frame, text="🌐 Modo Público", 
                                command=self.activate_public_mode, style='Secondary.TButton')
-        public_btn.pack(fill='x')
+        public_btn.pack(fill='x', pady=(0, 6))
+
+        undo_btn = ttk.Button(button_frame, text="↩️ Deshacer", 
+                             command=self.undo_startup_change, style='Secondary.TButton')
+        undo_btn.pack(fill='x', pady=(0, 6))
+
+        export_btn = ttk.Button(button_frame, text="📤 Exportar Vista", 
+                               command=self.export_view, style='Secondary.TButton')
+        export_btn.pack(fill='x', pady=(0, 6))
+
+        bulk_delete_btn = ttk.Button(button_frame, text="🧹 Eliminar Vista", 
+                                    command=self.delete_view, style='Danger.TButton')
+        bulk_delete_btn.pack(fill='x', pady=(0, 6))
+
+        import_btn = ttk.Button(button_frame, text="📥 Importar", 
+                               command=self.import_sessions, style='Secondary.TButton')
+        import_btn.pack(fill='x')
 
         # Ajustar columnas del manage_frame
         manage_frame.columnconfigure(0, weight=1)
@@ -408,7 +599,22 @@ class RDR2SessionManager:
         
         self.status_var = tk.StringVar(value="🌐 Modo Público Activo")
         status_label = ttk.Label(status_frame, textvariable=self.status_var, style='Status.TLabel')
-        status_label.grid(row=0, column=0)
+        status_label.grid(row=0, column=0, sticky=tk.W)
+
+        # Última notificación, modo silencioso e historial
+        self.notice_var = tk.StringVar()
+        notice_label = ttk.Label(status_frame, textvariable=self.notice_var, foreground='#cccccc')
+        notice_label.grid(row=0, column=1, sticky=tk.W, padx=(15, 0))
+
+        self.quiet_var = tk.BooleanVar(value=False)
+        quiet_check = ttk.Checkbutton(status_frame, text="🔕 Silencioso", variable=self.quiet_var,
+                                      command=lambda: self.notifier.set_quiet(self.quiet_var.get()))
+        quiet_check.grid(row=0, column=2, sticky=tk.E, padx=(15, 0))
+
+        history_btn = ttk.Button(status_frame, text="📜 Historial",
+                                 command=self.show_history, style='Secondary.TButton')
+        history_btn.grid(row=0, column=3, sticky=tk.E, padx=(8, 0))
+        status_frame.columnconfigure(1, weight=1)
         
         # Configurar el grid weights
         self.root.columnconfigure(0, weight=1)
@@ -422,6 +628,7 @@ class RDR2SessionManager:
         
         # Cargar sesiones en el treeview
         self.refresh_sessions_list()
+        self.refresh_quick_switch()
         
         # Configurar eventos de teclado y mouse
         self.setup_events()
@@ -442,6 +649,11 @@ class RDR2SessionManager:
         
         # F5 para refrescar
         self.root.bind('<F5>', lambda e: self.refresh_sessions_list())
+
+        # Ctrl+1..9 para cambiar a una de las sesiones recientes; Ctrl+Espacio abre el menú
+        for index in range(1, self.QUICK_SWITCH_SIZE + 1):
+            self.root.bind(f'<Control-Key-{index}>', lambda e, i=index: self.quick_switch_index(i - 1))
+        self.root.bind('<Control-space>', lambda e: self.quick_menu.tk_popup(e.x_root, e.y_root))
         
     def check_current_status(self):
         """Verifica el estado actual del juego"""
@@ -449,22 +661,23 @@ class RDR2SessionManager:
             self.status_var.set("⚠️ Configurar ruta del juego")
             return
             
-        startup_path = os.path.join(self.game_path.get(), "startup.meta")
-        
-        if os.path.exists(startup_path):
-            try:
-                with open(startup_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Intentar encontrar qué sesión está activa
-                    for name, key in self.sessions.items():
-                        if key in content:
-                            self.status_var.set(f"🔒 Sesión Activa: {name}")
-                            return
-                    self.status_var.set("🔒 Sesión Privada Activa (Desconocida)")
-            except:
-                self.status_var.set("🔒 Sesión Privada Activa")
-        else:
+        try:
+            # Identificar plantilla y clave de una sola pasada y buscar la sesión por clave
+            active, profile, key = self.writer.status(self.game_path.get())
+        except Exception:
+            self.status_var.set("🔒 Sesión Privada Activa")
+            return
+
+        if not active:
             self.status_var.set("🌐 Modo Público Activo")
+            return
+        matches = self.store.with_key(key) if key is not None else []
+        if matches:
+            self.status_var.set(f"🔒 Sesión Activa: {matches[0].name} (🧩 {profile})")
+        elif key is not None:
+            self.status_var.set(f"🔒 Sesión Privada Activa (Desconocida, 🧩 {profile})")
+        else:
+            self.status_var.set("🔒 Sesión Privada Activa (Desconocida)")
         
     def browse_game_path(self):
         """Permite seleccionar manualmente la ruta del juego"""
@@ -478,130 +691,545 @@ class RDR2SessionManager:
         webbrowser.open_new_tab(self.discord_url)
             
     def load_sessions(self):
-        """Carga las sesiones guardadas desde el archivo JSON"""
+        """Carga las sesiones guardadas desde el archivo JSON o la bóveda cifrada"""
+        if os.path.exists(self.vault_file):
+            self.load_vault()
+            return
+
+        self.backend = JsonSessionBackend(self.sessions_file)
         try:
-            if os.path.exists(self.sessions_file):
-                with open(self.sessions_file, 'r') as f:
-                    self.sessions = json.load(f)
-            else:
-                self.sessions = {}
-        except:
-            self.sessions = {}
+            self.store = self.backend.load()
+        except OSError as e:
+            # El backend queda en modo solo lectura: los cambios no sustituirán al archivo real
+            messagebox.showerror("❌ Error", f"No se pudo leer el archivo de sesiones:\n{str(e)}\n\n"
+                                 f"Los cambios no se guardarán hasta reiniciar la aplicación "
+                                 f"y poder leerlo.")
+            self.store = SessionStore()
+            return
+        self.report_recovery()
+
+    def report_recovery(self):
+        """Informa de una recuperación y conserva una copia del archivo dañado"""
+        report = self.backend.report
+        if not report:
+            return
+        backup_path = f"{self.backend.path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            shutil.copy2(self.backend.path, backup_path)
+            backed_up = True
+        except OSError:
+            backup_path = "(no se pudo crear la copia)"
+            backed_up = False
+        print(f"⚠️ Archivo de sesiones dañado: {report['recovered']} recuperadas, {report['damaged']} descartadas")
+        if backed_up and report['recovered']:
+            # Reescribir el archivo sin las líneas dañadas para no volver a avisar en cada inicio
+            try:
+                if isinstance(self.backend, SessionVault):
+                    self.backend.compact(self.store)
+                else:
+                    self.backend.commit(self.store)
+            except Exception as e:
+                print(f"⚠️ No se pudo reescribir el archivo de sesiones: {e}")
+        messagebox.showwarning(
+            "⚠️ Sesiones recuperadas",
+            f"El archivo de sesiones estaba dañado.\n\n"
+            f"✅ Sesiones recuperadas: {report['recovered']}\n"
+            f"❌ Registros dañados descartados: {report['damaged']}\n\n"
+            f"Copia del archivo original:\n{backup_path}")
+
+    def load_vault(self):
+        """Abre la bóveda cifrada; sin la contraseña no se puede continuar"""
+        for attempt in range(3):
+            try:
+                self.backend = SessionVault(self.vault_file, self.key_cache, self.ask_vault_password)
+                self.store = self.backend.load()
+                self.report_recovery()
+                return
+            except VaultError as e:
+                if str(e) != "Contraseña incorrecta":
+                    messagebox.showerror("❌ Bóveda", f"No se pudo abrir la bóveda: {str(e)}")
+                    break
+                messagebox.showerror("❌ Bóveda", "Contraseña incorrecta")
+        self.root.destroy()
+        sys.exit(1)
+
+    def ask_vault_password(self):
+        return simpledialog.askstring("🔐 Bóveda", "Contraseña de la bóveda de sesiones:",
+                                      show='*', parent=self.root)
             
-    def save_sessions(self):
-        """Guarda las sesiones en el archivo JSON"""
+    def save_sessions(self, changed=(), removed=(), snapshot=True):
+        """Guarda las sesiones; la bóveda solo escribe los registros modificados.
+
+        `snapshot=False` omite la copia previa cuando solo cambian los contadores de uso.
+        """
+        # Incluir los contadores de uso pendientes: este guardado ya los cubre
+        if self.pending_usage:
+            changed = list(changed) + [record for name, record in self.pending_usage.items()
+                                       if self.store.get(name) is record and record not in changed]
+            self.pending_usage.clear()
+        if self.usage_save_id is not None:
+            self.root.after_cancel(self.usage_save_id)
+            self.usage_save_id = None
         try:
-            with open(self.sessions_file, 'w') as f:
-                json.dump(self.sessions, f, indent=2)
+            # El JSON se reescribe completo: guardar antes la versión anterior
+            if snapshot and isinstance(self.backend, JsonSessionBackend):
+                self.snapshots.snapshot("store", self.backend.path, "Antes de guardar sesiones")
+            self.backend.commit(self.store, changed=changed, removed=removed)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar las sesiones: {str(e)}")
+
+    def enable_vault(self):
+        """Convierte el archivo de sesiones en una bóveda cifrada con contraseña"""
+        if AESGCM is None:
+            messagebox.showerror("❌ Bóveda", "Instala el paquete 'cryptography' para usar la bóveda cifrada")
+            return
+        if isinstance(self.backend, SessionVault):
+            messagebox.showinfo("🔐 Bóveda", "Las sesiones ya están cifradas")
+            return
+
+        password = simpledialog.askstring("🔐 Bóveda", "Nueva contraseña:", show='*', parent=self.root)
+        if not password:
+            return
+        if simpledialog.askstring("🔐 Bóveda", "Repite la contraseña:", show='*', parent=self.root) != password:
+            messagebox.showerror("❌ Bóveda", "Las contraseñas no coinciden")
+            return
+
+        try:
+            self.backend = SessionVault.create(self.vault_file, password, self.store,
+                                               self.key_cache, self.ask_vault_password)
+            if os.path.exists(self.sessions_file):
+                os.remove(self.sessions_file)
+            # Las versiones guardadas del JSON también tienen las claves en texto plano
+            self.snapshots.purge("store")
+        except Exception as e:
+            messagebox.showerror("❌ Bóveda", f"No se pudo crear la bóveda: {str(e)}")
+            return
+        self.notifier.notify(f"🔐 {len(self.store)} sesiones cifradas en la bóveda")
+
+    def lock_vault(self):
+        """Olvida la clave derivada; se pedirá la contraseña en el próximo guardado"""
+        self.key_cache.clear()
+        self.notifier.notify("🔒 Bóveda bloqueada")
             
     def create_session(self):
         """Crea una nueva sesión"""
-        name = self.session_name_var.get().strip()
-        key = self.session_key_var.get().strip()
-        
-        if not name or not key:
-            messagebox.showerror("❌ Error", "Debe ingresar tanto el nombre como la clave de la sesión")
-            return
-            
-        if name in self.sessions:
-            messagebox.showerror("❌ Error", f"Ya existe una sesión con el nombre '{name}'\n\nUse un nombre diferente.")
+        try:
+            record = SessionValidator(self.store).build(
+                self.session_name_var.get(),
+                self.session_key_var.get(),
+                group=self.session_group_var.get(),
+                tags=self.session_tags_var.get(),
+                profile=self.session_profile_var.get() or DEFAULT_PROFILE,
+            )
+        except ValueError as e:
+            self.notifier.error(f"❌ {str(e)}")
             return
-            
-        self.sessions[name] = key
-        self.save_sessions()
+
+        name = record.name
+        self.store.add(record)
+        self.save_sessions(changed=[record])
         self.refresh_sessions_list()
         
         # Limpiar campos
         self.session_name_var.set("")
         self.session_key_var.set("")
+        self.session_group_var.set("")
+        self.session_tags_var.set("")
+        self.session_profile_var.set(DEFAULT_PROFILE)
         
-        messagebox.showinfo("✅ ¡Éxito!", f"Sesión '{name}' creada correctamente\n\n🎯 Ahora puedes activarla desde la lista")
+        self.notifier.notify(f"✅ Sesión '{name}' creada correctamente", burst="✅ {n} sesiones creadas")
         
+    def import_sessions(self):
+        """Importa sesiones desde un JSON exportado o un CSV (nombre,clave,grupo,etiquetas)"""
+        path = filedialog.askopenfilename(title="Importar sesiones",
+                                          filetypes=[("Sesiones", "*.json *.csv *.txt"), ("Todos", "*.*")])
+        if not path:
+            return
+
+        imported = []
+        rejected = 0
+        try:
+            for number, record, error in SessionValidator(self.store).validate_stream(read_import_entries(path)):
+                if record is None:
+                    rejected += 1
+                    self.notifier.record(f"📥 Entrada {number} rechazada: {error}", level='error')
+                    continue
+                self.store.add(record)
+                imported.append(record)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.notifier.error(f"❌ No se pudo leer el archivo: {str(e)}")
+        finally:
+            if imported:
+                self.save_sessions(changed=imported)
+                self.refresh_sessions_list()
+
+        summary = f"📥 {len(imported)} sesiones importadas"
+        if rejected:
+            self.notifier.error(f"{summary}, {rejected} rechazadas (ver 📜 Historial)")
+        else:
+            self.notifier.notify(summary)
+
+    def refresh_view_options(self):
+        """Reconstruye las opciones del selector de vista a partir de los índices"""
+        self.view_options = {self.VIEW_ALL: ('all', None), self.VIEW_RECENT: ('recent', None)}
+        for group in self.store.groups():
+            self.view_options[f"📁 {group}"] = ('group', group)
+        for tag in self.store.tags():
+            self.view_options[f"🏷️ {tag}"] = ('tag', tag)
+        self.view_combo['values'] = list(self.view_options)
+        if self.view_var.get() not in self.view_options:
+            self.view_var.set(self.VIEW_ALL)
+
+    def get_view_records(self):
+        """Devuelve los registros de la vista actual usando los índices precalculados"""
+        kind, value = self.view_options.get(self.view_var.get(), ('all', None))
+        if kind == 'recent':
+            return self.store.most_recent(self.RECENT_LIMIT)
+        if kind == 'group':
+            return self.store.in_group(value)
+        if kind == 'tag':
+            return self.store.with_tag(value)
+        return list(self.store)
+
     def refresh_sessions_list(self):
         """Actualiza la lista de sesiones en el treeview"""
+        self.refresh_view_options()
+
         # Limpiar treeview
-        for item in self.sessions_tree.get_children():
-            self.sessions_tree.delete(item)
-            
-        # Agregar sesiones con iconos
-        for name, key in self.sessions.items():
-            # Truncar clave si es muy larga para mejor visualización
-            display_key = key if len(key) <= 30 else key[:27] + "..."
-            self.sessions_tree.insert('', tk.END, values=(f"🎮 {name}", f"🔑 {display_key}"))
+        items = self.sessions_tree.get_children()
+        if items:
+            self.sessions_tree.delete(*items)
+
+        # La vista guarda referencias a los registros; las filas se dibujan por páginas
+        self.view_records = self.get_view_records()
+        self.rendered_rows = 0
+        self.render_more_rows()
+
+    def render_more_rows(self):
+        """Dibuja la siguiente página de la vista (el nombre de la sesión es el id de la fila)"""
+        self.render_pending = False
+        start = self.rendered_rows
+        for record in self.view_records[start:start + self.TREE_PAGE_SIZE]:
+            self.sessions_tree.insert('', tk.END, iid=record.name, values=self.format_row(record))
+        self.rendered_rows = min(len(self.view_records), start + self.TREE_PAGE_SIZE)
+
+    @staticmethod
+    def format_row(record):
+        """Texto de la fila, formateado solo cuando se dibuja"""
+        # Truncar clave si es muy larga para mejor visualización
+        display_key = record.key if len(record.key) <= 30 else record.key[:27] + "..."
+        return (f"🎮 {record.name}", f"🔑 {display_key}", record.group,
+                ", ".join(record.tags), record.profile, record.use_count)
+
+    def on_tree_scroll(self, first, last):
+        """Mueve la barra y pide la siguiente página al llegar cerca del final"""
+        self.tree_scrollbar.set(first, last)
+        if float(last) >= 0.95 and self.rendered_rows < len(self.view_records) and not self.render_pending:
+            self.render_pending = True
+            self.root.after_idle(self.render_more_rows)
+
+    def get_selected_record(self):
+        """Devuelve el registro de la fila seleccionada o None"""
+        selection = self.sessions_tree.selection()
+        if not selection:
+            self.notifier.error("⚠️ Debe seleccionar una sesión")
+            return None
+        return self.store.get(selection[0])
             
     def activate_session(self):
         """Activa la sesión seleccionada"""
-        selection = self.sessions_tree.selection()
-        if not selection:
-            messagebox.showerror("Error", "Debe seleccionar una sesión")
+        record = self.get_selected_record()
+        if record is None:
             return
             
         if not self.game_path.get():
-            messagebox.showerror("Error", "Debe configurar la ruta del juego")
+            self.notifier.error("⚠️ Debe configurar la ruta del juego")
             return
             
         if not os.path.exists(self.game_path.get()):
-            messagebox.showerror("Error", "La ruta del juego no existe")
+            self.notifier.error("⚠️ La ruta del juego no existe")
             return
             
-        # Obtener datos de la sesión seleccionada
-        item = self.sessions_tree.item(selection[0])
-        session_name = item['values'][0]
-        session_key_display = item['values'][1]
-        session_key = session_key_display.replace('🔑', '', 1).strip()
-
-        # Generar archivo startup.meta
-        startup_content = self.startup_template.format(session_key=session_key)
-        startup_path = os.path.join(self.game_path.get(), "startup.meta")
+        session_name = record.name
 
         try:
-            with open(startup_path, 'w', encoding='utf-8') as f:
-                f.write(startup_content)
+            self.write_session(record)
+        except Exception as e:
+            self.notifier.error(f"❌ No se pudo activar la sesión: {str(e)}")
+            return
+
+        # write_session ya actualizó la fila: la página cargada y la selección se conservan
+        self.status_var.set(f"Sesión Privada Activa: {session_name}")
+        self.notifier.notify(f"🚀 Sesión '{session_name}' activada correctamente",
+                             burst="🚀 {n} activaciones de sesión")
+
+    def write_session(self, record):
+        """Escribe startup.meta con el payload precalculado y registra el uso"""
+        self.writer.activate(self.game_path.get(), record.key, record.profile,
+                             label=f"Antes de activar '{record.name}'")
 
-            self.status_var.set(f"Sesión Privada Activa: {session_name}")
-            messagebox.showinfo("Éxito", f"Sesión '{session_name}' activada correctamente")
+        # Actualizar el índice de recientes de forma incremental (sin copiar el almacén entero)
+        self.store.touch(record.name)
+        # El uso se guarda más tarde en una sola escritura para todos los cambios seguidos
+        self.pending_usage[record.name] = record
+        if self.usage_save_id is None:
+            self.usage_save_id = self.root.after(self.USAGE_SAVE_MS, self.save_usage)
+        self.update_row(record)
+        self.refresh_quick_switch()
+
+    def save_usage(self):
+        """Guarda de una vez los contadores de uso acumulados"""
+        self.usage_save_id = None
+        if self.pending_usage:
+            self.save_sessions(snapshot=False)
+
+    def update_row(self, record):
+        """Actualiza solo la fila de la sesión, sin reconstruir la tabla"""
+        if self.sessions_tree.exists(record.name):
+            self.sessions_tree.item(record.name, values=self.format_row(record))
+
+    def get_payload(self, record):
+        """Payload de la sesión; la caché se invalida si cambia el mtime de su plantilla"""
+        return self.writer.payload(record.key, record.profile)
+
+    def set_session_profile(self, profile):
+        """Asigna un perfil de plantilla a la sesión seleccionada"""
+        record = self.get_selected_record()
+        if record is None:
+            return
+        record.profile = profile
+        self.save_sessions(changed=[record])
+        self.update_row(record)
+        self.notifier.notify(f"🧩 Sesión '{record.name}' usará la plantilla '{profile}'")
 
+    def open_templates_folder(self):
+        """Abre la carpeta de plantillas en el explorador"""
+        if hasattr(os, 'startfile'):
+            os.startfile(self.templates.directory)
+        else:
+            import webbrowser
+            webbrowser.open(Path(self.templates.directory).as_uri())
+
+    def refresh_quick_switch(self):
+        """Reconstruye el menú de cambio rápido y precarga sus payloads"""
+        self.quick_menu.delete(0, tk.END)
+        recent = self.store.most_recent(self.QUICK_SWITCH_SIZE)
+        for index, record in enumerate(recent, start=1):
+            try:
+                self.get_payload(record)
+            except ValueError:
+                pass
+            self.quick_menu.add_command(label=f"🎮 {record.name}", accelerator=f"Ctrl+{index}",
+                                        command=lambda name=record.name: self.quick_switch(name))
+        if not recent:
+            self.quick_menu.add_command(label="(Sin sesiones recientes)", state=tk.DISABLED)
+
+    def quick_switch_index(self, index):
+        """Cambia a la sesión reciente en la posición indicada"""
+        recent = self.store.most_recent(index + 1)
+        if index < len(recent):
+            self.quick_switch(recent[index].name)
+
+    def quick_switch(self, session_name):
+        """Activa una sesión reciente sin diálogos modales"""
+        record = self.store.get(session_name)
+        if record is None or not self.game_path.get() or not os.path.exists(self.game_path.get()):
+            self.notifier.error("⚠️ No se pudo cambiar de sesión: revise la ruta del juego")
+            return
+
+        try:
+            self.write_session(record)
         except Exception as e:
-            messagebox.showerror("Error", f"No se pudo activar la sesión: {str(e)}")
+            self.notifier.error(f"❌ No se pudo activar la sesión: {str(e)}")
             return
 
+        self.status_var.set(f"Sesión Privada Activa: {session_name}")
+        self.notifier.notify(f"🚀 Sesión '{session_name}' activada",
+                             burst="🚀 {n} activaciones de sesión")
+
+    def show_toast(self, level, message):
+        """Muestra una notificación temporal que no bloquea la ventana"""
+        self.notice_var.set(message.splitlines()[-1])
+        bg = '#dc3545' if level == 'error' else '#2d2d2d'
+        # Una sola ventana de aviso: se reutiliza en lugar de apilar una nueva en cada aviso
+        if self.toast is None or not self.toast.winfo_exists():
+            self.toast = tk.Toplevel(self.root)
+            self.toast.overrideredirect(True)
+            self.toast_label = tk.Label(self.toast, fg='white', justify=tk.LEFT,
+                                        font=('Segoe UI', 9, 'bold'), padx=16, pady=10)
+            self.toast_label.pack()
+        self.toast.configure(bg=bg)
+        self.toast_label.configure(text=message, bg=bg)
+        self.toast.update_idletasks()
+        x = self.root.winfo_rootx() + self.root.winfo_width() - self.toast.winfo_width() - 20
+        y = self.root.winfo_rooty() + self.root.winfo_height() - self.toast.winfo_height() - 20
+        self.toast.geometry(f"+{x}+{y}")
+        self.toast.deiconify()
+        self.toast.lift()
+        # Reiniciar el temporizador para que el aviso nuevo dure lo mismo que el primero
+        if self.toast_hide_id is not None:
+            self.root.after_cancel(self.toast_hide_id)
+        self.toast_hide_id = self.root.after(self.TOAST_MS, self.hide_toast)
+
+    def hide_toast(self):
+        self.toast_hide_id = None
+        if self.toast is not None and self.toast.winfo_exists():
+            self.toast.withdraw()
+
+    def show_history(self):
+        """Muestra el historial de notificaciones en una ventana no modal"""
+        window = tk.Toplevel(self.root)
+        window.title("📜 Historial de notificaciones")
+        window.geometry("520x360")
+        window.configure(bg='#1a1a1a')
+        text = tk.Text(window, bg='#2d2d2d', fg='white', font=('Segoe UI', 9), relief='flat')
+        text.pack(fill='both', expand=True, padx=8, pady=8)
+        self.notifier.write_log()
+        if self.notifier.logged:
+            text.insert(tk.END, f"… {self.notifier.logged} eventos anteriores en {self.notifier.log_path}\n")
+        for when, level, message in self.notifier.history:
+            text.insert(tk.END, f"[{time.strftime('%H:%M:%S', time.localtime(when))}] {message}\n")
+        text.configure(state=tk.DISABLED)
+        text.see(tk.END)
+
     def delete_session(self):
         """Elimina la sesión seleccionada"""
-        selection = self.sessions_tree.selection()
-        if not selection:
-            messagebox.showerror("Error", "Debe seleccionar una sesión")
+        record = self.get_selected_record()
+        if record is None:
             return
-            
-        item = self.sessions_tree.item(selection[0])
-        session_name_display = item['values'][0]
-        # Quitar el emoji y espacios del nombre
-        session_name = session_name_display.replace('🎮', '', 1).strip()
+        session_name = record.name
 
         if messagebox.askyesno("Confirmar", f"¿Está seguro de eliminar la sesión '{session_name}'?"):
-            del self.sessions[session_name]
-            self.save_sessions()
+            self.store.remove(session_name)
+            self.save_sessions(removed=[record])
             self.refresh_sessions_list()
-            messagebox.showinfo("Éxito", f"Sesión '{session_name}' eliminada correctamente")
+            self.refresh_quick_switch()
+            self.notifier.notify(f"🗑️ Sesión '{session_name}' eliminada correctamente",
+                                 burst="🗑️ {n} sesiones eliminadas")
+
+    def get_bulk_view(self):
+        """Devuelve (descripción, registros) de la vista actual si es un grupo o etiqueta"""
+        kind, value = self.view_options.get(self.view_var.get(), ('all', None))
+        if kind not in ('group', 'tag'):
+            messagebox.showerror("Error", "Seleccione una vista de grupo o etiqueta")
+            return None, None
+        label = f"el grupo '{value}'" if kind == 'group' else f"la etiqueta '{value}'"
+        return label, self.get_view_records()
+
+    def export_view(self):
+        """Exporta a JSON todas las sesiones del grupo o etiqueta seleccionados"""
+        label, records = self.get_bulk_view()
+        if records is None:
+            return
+
+        path = filedialog.asksaveasfilename(title="Exportar sesiones", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"version": 2, "sessions": {r.name: r.to_dict() for r in records}},
+                          f, indent=2, ensure_ascii=False)
+            messagebox.showinfo("Éxito", f"{len(records)} sesiones de {label} exportadas correctamente")
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo exportar: {str(e)}")
+
+    def delete_view(self):
+        """Elimina todas las sesiones del grupo o etiqueta seleccionados"""
+        label, records = self.get_bulk_view()
+        if records is None:
+            return
+
+        if messagebox.askyesno("Confirmar", f"¿Está seguro de eliminar las {len(records)} sesiones de {label}?"):
+            self.store.remove_many(record.name for record in records)
+            self.save_sessions(removed=records)
+            self.refresh_sessions_list()
+            self.refresh_quick_switch()
+            messagebox.showinfo("Éxito", f"{len(records)} sesiones eliminadas correctamente")
             
     def activate_public_mode(self):
         """Activa el modo público eliminando el archivo startup.meta"""
         if not self.game_path.get():
-            messagebox.showerror("Error", "Debe configurar la ruta del juego")
+            self.notifier.error("⚠️ Debe configurar la ruta del juego")
             return
             
-        startup_path = os.path.join(self.game_path.get(), "startup.meta")
-        
         try:
-            if os.path.exists(startup_path):
-                os.remove(startup_path)
-                
+            self.writer.deactivate(self.game_path.get(), label="Antes de activar el modo público")
+
             self.status_var.set("Modo Público Activo")
-            messagebox.showinfo("Éxito", "Modo público activado correctamente")
+            self.notifier.notify("🌐 Modo público activado correctamente")
             
         except Exception as e:
-            messagebox.showerror("Error", f"No se pudo activar el modo público: {str(e)}")
+            self.notifier.error(f"❌ No se pudo activar el modo público: {str(e)}")
+
+    def undo_startup_change(self):
+        """Restaura con un clic la versión anterior de startup.meta"""
+        try:
+            entry = self.snapshots.rollback("startup")
+        except Exception as e:
+            self.notifier.error(f"❌ No se pudo deshacer: {str(e)}")
+            return
+        if entry is None:
+            self.notifier.error("⚠️ No hay versiones anteriores de startup.meta")
+            return
+        self.check_current_status()
+        self.notifier.notify(f"↩️ Deshecho: {entry['label']}", burst="↩️ {n} cambios deshechos")
+
+    def show_snapshots(self):
+        """Lista las versiones guardadas y permite restaurar cualquiera"""
+        window = tk.Toplevel(self.root)
+        window.title("🕘 Versiones guardadas")
+        window.geometry("640x360")
+        window.configure(bg='#1a1a1a')
+
+        tree = ttk.Treeview(window, columns=('time', 'target', 'label', 'size'), show='headings',
+                            style='Modern.Treeview')
+        for column, text, width in (('time', '🕒 Fecha', 140), ('target', '📄 Archivo', 90),
+                                    ('label', '📝 Descripción', 300), ('size', '📏 Tamaño', 80)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width, anchor='w')
+        tree.pack(fill='both', expand=True, padx=8, pady=(8, 4))
+
+        entries = {}
+        for entry in self.snapshots.history():
+            iid = str(entry["id"])
+            entries[iid] = entry
+            target = "startup.meta" if entry["target"] == "startup" else "sesiones"
+            size = "(sin archivo)" if entry["blob"] is None else f"{entry['size']:,} B"
+            tree.insert('', tk.END, iid=iid, values=(
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry["time"])),
+                target, entry["label"], size))
+
+        ttk.Label(window, text=f"📦 {self.snapshots.total_bytes() / 1024:.1f} KB en disco "
+                               f"({len(entries)} versiones)").pack(side=tk.LEFT, padx=8, pady=(0, 8))
+        ttk.Button(window, text="↩️ Restaurar", style='Accent.TButton',
+                   command=lambda: self.restore_snapshot(tree, entries)).pack(side=tk.RIGHT, padx=8, pady=(0, 8))
+
+    def restore_snapshot(self, tree, entries):
+        """Restaura la versión seleccionada guardando antes la actual"""
+        selection = tree.selection()
+        if not selection:
+            self.notifier.error("⚠️ Debe seleccionar una versión")
+            return
+        entry = entries[selection[0]]
+        if entry["target"] == "store" and os.path.exists(self.vault_file):
+            # Restaurarla dejaría un JSON en texto plano junto a la bóveda
+            self.notifier.error("🔐 Las sesiones están cifradas: no se pueden restaurar versiones del JSON")
+            return
+        try:
+            self.snapshots.snapshot(entry["target"], entry["path"], "Antes de restaurar una versión")
+            self.snapshots.restore(entry)
+        except Exception as e:
+            self.notifier.error(f"❌ No se pudo restaurar: {str(e)}")
+            return
+
+        if entry["target"] == "store":
+            self.load_sessions()
+            self.refresh_sessions_list()
+            self.refresh_quick_switch()
+        self.check_current_status()
+        self.notifier.notify("↩️ Versión restaurada correctamente")
 
     def show_credits(self):
         """Muestra información de créditos"""
@@ -635,14 +1263,17 @@ class RDR2SessionManager:
         
         messagebox.showinfo("ℹ️ Créditos", credits_msg)
             
-    def run(self):
+    def run(self, startup_probe=False):
         """Ejecuta la aplicación con manejo de errores"""
         try:
             # Configurar el comportamiento al cerrar
             self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
             
+            # Sonda de arranque: cerrar en cuanto la ventana esté lista
+            if startup_probe:
+                self.root.after_idle(self.root.destroy)
             # Mostrar mensaje de bienvenida si es la primera vez
-            if not self.sessions:
+            elif not self.store:
                 self.show_welcome_message()
             
             # Iniciar el loop principal
@@ -656,8 +1287,12 @@ class RDR2SessionManager:
         """Maneja el cierre de la aplicación"""
         try:
             # Guardar sesiones antes de cerrar
-            if hasattr(self, 'sessions'):
-                self.save_sessions()
+            if hasattr(self, 'store') and isinstance(self.backend, JsonSessionBackend):
+                if self.backend.load_error is None:
+                    self.save_sessions()
+            elif hasattr(self, 'store'):
+                self.save_usage()
+            self.notifier.write_log()
             self.root.destroy()
         except:
             self.root.destroy()
@@ -682,10 +1317,27 @@ class RDR2SessionManager:
         messagebox.showinfo("🎮 ¡Bienvenido!", welcome_msg)
 
 if __name__ == "__main__":
+    # --startup-probe: usado por build_exe.py para medir el tiempo de arranque
+    startup_probe = "--startup-probe" in sys.argv
     try:
         app = RDR2SessionManager()
-        app.run()
+        app.run(startup_probe=startup_probe)
+
+        # Traza de importaciones para el build recortado (build_exe.py --trim)
+        trace_path = os.environ.get("RDR2SM_IMPORT_TRACE")
+        if startup_probe and trace_path:
+            # Módulos que la app solo importa bajo demanda: cargarlos para incluir sus dependencias
+            import importlib
+            for name in filter(None, os.environ.get("RDR2SM_IMPORT_KEEP", "").split(",")):
+                try:
+                    importlib.import_module(name)
+                except ImportError:
+                    pass
+            with open(trace_path, 'w', encoding='utf-8') as f:
+                json.dump(sorted(name for name, module in sys.modules.items() if module is not None), f)
     except Exception as e:
+        if startup_probe:
+            raise
         # Manejo de errores a nivel de aplicación
         import tkinter as tk
         root = tk.Tk()